@@ -0,0 +1,202 @@
+# api/autotune.py
+"""
+Calibración automática de los parámetros de inferencia.
+
+Mide el rendimiento de cada modelo con textos del dataset incluido para varias
+combinaciones de hilos y tamaño de lote, elige la de mayor rendimiento cuya
+latencia por lote (p95) no supera el límite y la guarda en models/autotune.json.
+
+    python -m api.autotune --latency-bound-ms 200
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import time
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LATENCY_BOUND_MS = 250.0
+DEFAULT_TRIAL_SECONDS = 3.0
+SAMPLE_SIZE = 256
+
+DEFAULT_SETTINGS = {
+    "transformer": {"torch_threads": None, "interop_threads": 1, "batch_size": 8},
+    "traditional": {"blas_threads": None, "batch_size": 64}
+}
+
+# Mantener viva la limitación de hilos BLAS aplicada
+_blas_limits = None
+
+
+def available_cpus() -> int:
+    """CPUs que puede usar el proceso (respeta la afinidad en Linux)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def thread_candidates(cpu_count: int) -> List[int]:
+    """Potencias de dos hasta el número de CPUs, más el propio número de CPUs."""
+    candidates = []
+    threads = 1
+    while threads < cpu_count:
+        candidates.append(threads)
+        threads *= 2
+    candidates.append(cpu_count)
+    return candidates
+
+
+def candidate_settings(model_type: str, cpu_count: int) -> List[Dict]:
+    """Combinaciones de parámetros que se prueban para cada tipo de modelo."""
+    threads = thread_candidates(cpu_count)
+    if model_type == "transformer":
+        return [{"torch_threads": t, "interop_threads": 1, "batch_size": b}
+                for t in threads for b in (1, 4, 8, 16, 32)]
+    return [{"blas_threads": t, "batch_size": b}
+            for t in threads for b in (1, 16, 64, 256)]
+
+
+def apply_settings(model_type: str, settings: Dict, startup: bool = False):
+    """
+    Aplica los hilos de una configuración al proceso.
+
+    Los hilos inter-op de torch solo se pueden fijar antes de la primera
+    inferencia, así que únicamente se aplican al arrancar.
+    """
+    global _blas_limits
+    if model_type == "transformer":
+        import torch
+        if settings.get("torch_threads"):
+            torch.set_num_threads(settings["torch_threads"])
+        if startup and settings.get("interop_threads"):
+            try:
+                torch.set_num_interop_threads(settings["interop_threads"])
+            except RuntimeError as e:
+                logger.warning(f"No se pudieron fijar los hilos inter-op: {e}")
+    elif settings.get("blas_threads"):
+        from threadpoolctl import threadpool_limits
+        _blas_limits = threadpool_limits(limits=settings["blas_threads"], user_api="blas")
+
+
+def benchmark(predict_batch: Callable[[List[str]], list], texts: List[str], batch_size: int,
+              max_seconds: float = DEFAULT_TRIAL_SECONDS) -> Dict:
+    """
+    Ejecuta lotes hasta recorrer los textos o agotar el tiempo y mide rendimiento y latencia.
+
+    Returns:
+        Dict con textos por segundo y latencias por lote en milisegundos
+    """
+    predict_batch(texts[:batch_size])  # calentamiento
+
+    latencies = []
+    processed = 0
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        batch = texts[i:i + batch_size]
+        batch_start = time.perf_counter()
+        predict_batch(batch)
+        latencies.append((time.perf_counter() - batch_start) * 1000)
+        processed += len(batch)
+        if time.perf_counter() - start > max_seconds:
+            break
+
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "throughput": processed / elapsed if elapsed else 0.0,
+        "p50_latency_ms": statistics.median(latencies),
+        "p95_latency_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    }
+
+
+def select_best(results: List[Dict], latency_bound_ms: float) -> Dict:
+    """
+    Elige la configuración con mayor rendimiento dentro del límite de latencia.
+
+    Si ninguna lo cumple, se queda con la de menor latencia.
+    """
+    within_bound = [r for r in results if r["p95_latency_ms"] <= latency_bound_ms]
+    if within_bound:
+        return max(within_bound, key=lambda r: r["throughput"])
+    return min(results, key=lambda r: r["p95_latency_ms"])
+
+
+def autotune(predictors: Dict[str, Callable[[List[str]], list]], texts: List[str],
+             latency_bound_ms: float = DEFAULT_LATENCY_BOUND_MS,
+             max_seconds: float = DEFAULT_TRIAL_SECONDS,
+             cpu_count: Optional[int] = None, backend: str = "cpu") -> Dict:
+    """
+    Calibra cada tipo de modelo y devuelve la mejor configuración encontrada.
+
+    Args:
+        predictors: Función de predicción por lotes para cada tipo de modelo
+        texts: Textos de muestra
+        latency_bound_ms: Latencia máxima (p95) aceptable por lote
+        max_seconds: Duración máxima de cada prueba
+        cpu_count: CPUs disponibles (por defecto, las del proceso)
+        backend: Dispositivo de inferencia que se registra en la configuración
+    """
+    cpu_count = cpu_count or available_cpus()
+    config = {"latency_bound_ms": latency_bound_ms, "cpu_count": cpu_count, "models": {}}
+
+    for model_type, predict_batch in predictors.items():
+        results = []
+        for settings in candidate_settings(model_type, cpu_count):
+            apply_settings(model_type, settings)
+            measurement = benchmark(predict_batch, texts, settings["batch_size"], max_seconds)
+            logger.info(f"Autotune {model_type} {settings}: {measurement}")
+            results.append({**settings, **measurement})
+
+        best = select_best(results, latency_bound_ms)
+        config["models"][model_type] = {**best, "backend": backend}
+        apply_settings(model_type, best)
+
+    config["tuned_at"] = time.time()
+    return config
+
+
+def load_settings(path: str) -> Optional[Dict]:
+    """Lee la configuración guardada o None si no existe."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"Error leyendo la configuración de autotune: {e}")
+        return None
+
+
+def save_settings(path: str, config: Dict):
+    """Guarda la configuración de forma atómica."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def model_settings(config: Optional[Dict], model_type: str) -> Dict:
+    """Configuración de un tipo de modelo, con los valores por defecto para lo que falte."""
+    tuned = (config or {}).get("models", {}).get(model_type, {})
+    return {**DEFAULT_SETTINGS[model_type], **tuned}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibración de los parámetros de inferencia")
+    parser.add_argument("--latency-bound-ms", type=float, default=DEFAULT_LATENCY_BOUND_MS)
+    parser.add_argument("--trial-seconds", type=float, default=DEFAULT_TRIAL_SECONDS)
+    parser.add_argument("--model", choices=["transformer", "traditional"], action="append",
+                        help="Tipo de modelo a calibrar (por defecto, ambos)")
+    args = parser.parse_args()
+
+    # Importación diferida: cargar los modelos solo al ejecutar la calibración
+    from api.main import run_autotune
+    config = run_autotune(args.latency_bound_ms, args.model, args.trial_seconds)
+    print(json.dumps(config, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+# api/bundle.py
+"""
+Formato de paquete de modelos versionado y mapeado en memoria.
+
+Estructura de un paquete (models/bundle/<version>/):
+
+    manifest.json                  versión, umbral, checksums y ficheros de cada modelo
+    traditional/vectorizer.joblib  TF-IDF (vector IDF como array numpy)
+    traditional/selector.joblib    selector de características (máscara como array numpy)
+    traditional/ensemble.joblib    modelo ensemble (coeficientes como arrays numpy)
+    transformer/model.safetensors  pesos del transformer
+    transformer/config.json        configuración y tokenizer del transformer
+
+Los ficheros joblib se guardan sin comprimir para que `joblib.load(mmap_mode="r")`
+mapee los arrays numpy en memoria de solo lectura, y los pesos safetensors se
+mapean con copia en escritura. Así varios workers comparten las mismas páginas
+del sistema operativo en lugar de tener cada uno su copia en el heap.
+
+Uso:
+    python -m api.bundle build --version 2.1
+    python -m api.bundle verify models/bundle/2.1
+"""
+import argparse
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+import joblib
+import torch
+from safetensors.torch import load_file, save_file
+from transformers import AutoConfig, AutoModelForSequenceClassification, AutoTokenizer
+from transformers.modeling_utils import no_init_weights
+
+from src.config import load_config
+
+FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+CURRENT_NAME = "CURRENT"
+
+TRADITIONAL_FILES = {
+    "model": "traditional/ensemble.joblib",
+    "vectorizer": "traditional/vectorizer.joblib",
+    "selector": "traditional/selector.joblib"
+}
+TRANSFORMER_DIR = "transformer"
+TRANSFORMER_WEIGHTS = "transformer/model.safetensors"
+
+
+class BundleError(Exception):
+    """Error al construir, verificar o cargar un paquete de modelos."""
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    """Calcula el SHA-256 de un fichero leyéndolo por bloques."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def bundle_root(models_path: str) -> str:
+    return os.path.join(models_path, "bundle")
+
+
+def resolve_bundle(models_path: str) -> Optional[str]:
+    """
+    Devuelve la ruta del paquete activo o None si no hay ninguno.
+
+    Se usa la variable MODEL_BUNDLE si está definida; si no, la versión indicada
+    en models/bundle/CURRENT.
+    """
+    configured = load_config("MODEL_BUNDLE")
+    if configured:
+        return configured
+
+    current_path = os.path.join(bundle_root(models_path), CURRENT_NAME)
+    if not os.path.exists(current_path):
+        return None
+    with open(current_path, encoding="utf-8") as f:
+        version = f.read().strip()
+    return os.path.join(bundle_root(models_path), version) if version else None
+
+
+def requested_bundle_path(models_path: str, requested: str) -> str:
+    """
+    Ruta de un paquete pedido por la API de administración (una versión o una ruta).
+
+    Solo se admiten paquetes dentro de models/bundle/: joblib deserializa con
+    pickle, así que cargar un fichero arbitrario equivale a ejecutar código.
+    """
+    root = os.path.realpath(bundle_root(models_path))
+    path = os.path.realpath(os.path.join(root, requested))
+    if path == root or os.path.commonpath([root, path]) != root:
+        raise BundleError(f"El paquete debe estar dentro de {root}")
+    return path
+
+
+def load_manifest(bundle_path: str) -> Dict:
+    """Lee el manifiesto de un paquete y comprueba que los ficheros existen con el tamaño esperado."""
+    manifest_path = os.path.join(bundle_path, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(f"No existe el manifiesto {manifest_path}")
+
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise BundleError(f"Versión de formato no soportada: {manifest.get('format_version')}")
+
+    for name, info in manifest["files"].items():
+        path = os.path.join(bundle_path, name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Falta el fichero {path} del paquete")
+        if os.path.getsize(path) != info["size"]:
+            raise BundleError(f"Tamaño incorrecto en {path}")
+
+    return manifest
+
+
+def verify_bundle(bundle_path: str) -> Dict:
+    """Comprueba los checksums de todos los ficheros del paquete."""
+    manifest = load_manifest(bundle_path)
+    for name, info in manifest["files"].items():
+        if file_sha256(os.path.join(bundle_path, name)) != info["sha256"]:
+            raise BundleError(f"Checksum incorrecto en {name}")
+    return manifest
+
+
+def build_bundle(models_path: str, version: str, threshold: float,
+                 output_path: Optional[str] = None, set_current: bool = True) -> str:
+    """
+    Convierte los modelos actuales (pkl + directorio de Hugging Face) en un paquete.
+
+    Returns:
+        str: Ruta del paquete creado
+    """
+    output_path = output_path or os.path.join(bundle_root(models_path), version)
+    os.makedirs(os.path.join(output_path, "traditional"), exist_ok=True)
+    os.makedirs(os.path.join(output_path, TRANSFORMER_DIR), exist_ok=True)
+
+    # Modelo tradicional: volcado joblib sin comprimir para poder mapear los arrays
+    legacy_files = {
+        "model": "ensemble_model.pkl",
+        "vectorizer": "vectorizer_2.pkl",
+        "selector": "feature_selector.pkl"
+    }
+    for key, legacy_name in legacy_files.items():
+        component = joblib.load(os.path.join(models_path, legacy_name))
+        joblib.dump(component, os.path.join(output_path, TRADITIONAL_FILES[key]), compress=0)
+
+    # Transformer: pesos en safetensors, configuración y tokenizer al lado
+    transformer_dir = os.path.join(output_path, TRANSFORMER_DIR)
+    model = AutoModelForSequenceClassification.from_pretrained(models_path)
+    state_dict = {name: tensor.contiguous() for name, tensor in model.state_dict().items()}
+    save_file(state_dict, os.path.join(output_path, TRANSFORMER_WEIGHTS), metadata={"format": "pt"})
+    model.config.save_pretrained(transformer_dir)
+    AutoTokenizer.from_pretrained(models_path).save_pretrained(transformer_dir)
+
+    files = {}
+    for root, _, names in os.walk(output_path):
+        for name in names:
+            if name == MANIFEST_NAME:
+                continue
+            path = os.path.join(root, name)
+            relative = os.path.relpath(path, output_path).replace(os.sep, "/")
+            files[relative] = {"sha256": file_sha256(path), "size": os.path.getsize(path)}
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "version": version,
+        "threshold": threshold,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "models": {
+            "traditional": TRADITIONAL_FILES,
+            "transformer": {"dir": TRANSFORMER_DIR, "weights": TRANSFORMER_WEIGHTS}
+        },
+        "files": files
+    }
+    with open(os.path.join(output_path, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    if set_current and output_path == os.path.join(bundle_root(models_path), version):
+        with open(os.path.join(bundle_root(models_path), CURRENT_NAME), "w", encoding="utf-8") as f:
+            f.write(version)
+
+    return output_path
+
+
+def load_traditional(bundle_path: str, manifest: Dict) -> tuple:
+    """Carga el modelo tradicional con los arrays mapeados en memoria de solo lectura."""
+    files = manifest["models"]["traditional"]
+    model = joblib.load(os.path.join(bundle_path, files["model"]), mmap_mode="r")
+    vectorizer = joblib.load(os.path.join(bundle_path, files["vectorizer"]), mmap_mode="r")
+    selector = joblib.load(os.path.join(bundle_path, files["selector"]), mmap_mode="r")
+    return model, vectorizer, selector
+
+
+def load_transformer(bundle_path: str, manifest: Dict, device: torch.device) -> tuple:
+    """
+    Carga el transformer usando directamente los tensores mapeados del fichero safetensors.
+
+    El modelo se construye sin inicializar pesos y `assign=True` hace que sus
+    parámetros apunten a los tensores mapeados en lugar de copiarlos.
+    """
+    info = manifest["models"]["transformer"]
+    transformer_dir = os.path.join(bundle_path, info["dir"])
+
+    config = AutoConfig.from_pretrained(transformer_dir)
+    with no_init_weights():
+        model = AutoModelForSequenceClassification.from_config(config)
+
+    state_dict = load_file(os.path.join(bundle_path, info["weights"]))
+    model.load_state_dict(state_dict, strict=True, assign=True)
+    model = model.to(device)
+    model.eval()
+
+    tokenizer = AutoTokenizer.from_pretrained(transformer_dir)
+    return model, tokenizer
+
+
+def load_legacy_models(models_path: str, device: torch.device, threshold: float) -> Dict:
+    """Carga los modelos en el formato antiguo (pkl + directorio de Hugging Face)."""
+    traditional_model = joblib.load(os.path.join(models_path, "ensemble_model.pkl"))
+    tfidf = joblib.load(os.path.join(models_path, "vectorizer_2.pkl"))
+    selector = joblib.load(os.path.join(models_path, "feature_selector.pkl"))
+
+    transformer_model = AutoModelForSequenceClassification.from_pretrained(models_path)
+    tokenizer = AutoTokenizer.from_pretrained(models_path)
+    transformer_model = transformer_model.to(device)
+    transformer_model.eval()
+
+    return {
+        "version": "2.0",
+        "threshold": threshold,
+        "traditional_model": traditional_model,
+        "tfidf": tfidf,
+        "selector": selector,
+        "transformer_model": transformer_model,
+        "tokenizer": tokenizer
+    }
+
+
+def load_models(models_path: str, device: torch.device, default_threshold: float,
+                bundle_path: Optional[str] = None) -> Dict:
+    """
+    Carga ambos modelos desde el paquete activo o, si no hay paquete, desde los ficheros antiguos.
+
+    Args:
+        models_path: Directorio de modelos
+        device: Dispositivo de torch para el transformer
+        default_threshold: Umbral a usar con los ficheros antiguos
+        bundle_path: Paquete concreto a cargar (opcional, por defecto el activo)
+    """
+    bundle_path = bundle_path or resolve_bundle(models_path)
+    if not bundle_path:
+        return load_legacy_models(models_path, device, default_threshold)
+
+    if load_config("MODEL_BUNDLE_VERIFY") == "1":
+        manifest = verify_bundle(bundle_path)
+    else:
+        manifest = load_manifest(bundle_path)
+
+    traditional_model, tfidf, selector = load_traditional(bundle_path, manifest)
+    transformer_model, tokenizer = load_transformer(bundle_path, manifest, device)
+
+    return {
+        "version": manifest["version"],
+        "threshold": manifest["threshold"],
+        "traditional_model": traditional_model,
+        "tfidf": tfidf,
+        "selector": selector,
+        "transformer_model": transformer_model,
+        "tokenizer": tokenizer
+    }
+
+
+def main():
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    models_path = os.path.join(base_path, "..", "models")
+
+    parser = argparse.ArgumentParser(description="Gestión de paquetes de modelos")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Crea un paquete a partir de los modelos actuales")
+    build_parser.add_argument("--version", required=True)
+    build_parser.add_argument("--threshold", type=float, default=0.59)
+    build_parser.add_argument("--output")
+    build_parser.add_argument("--no-current", action="store_true",
+                              help="No marcar el paquete como activo")
+
+    verify_parser = subparsers.add_parser("verify", help="Comprueba los checksums de un paquete")
+    verify_parser.add_argument("path")
+
+    args = parser.parse_args()
+    if args.command == "build":
+        path = build_bundle(models_path, args.version, args.threshold,
+                            output_path=args.output, set_current=not args.no_current)
+        print(f"Paquete creado en {path}")
+    else:
+        manifest = verify_bundle(args.path)
+        print(f"Paquete {manifest['version']} verificado correctamente")
+
+
+if __name__ == "__main__":
+    main()
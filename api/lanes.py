@@ -0,0 +1,170 @@
+# api/lanes.py
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+# Carril de fondo (puntuación en sombra): solo se atiende cuando los demás están vacíos
+SHADOW = "shadow"
+DEFAULT_WEIGHTS = {INTERACTIVE: 8, BULK: 1}
+
+
+class LanesPaused(RuntimeError):
+    """Los carriles no admiten trabajos nuevos (p. ej. durante la calibración)."""
+
+
+class LaneScheduler:
+    """
+    Cola de inferencia con carriles de prioridad.
+
+    Las peticiones interactivas (un texto) y las masivas (lotes de comentarios)
+    esperan en colas separadas. Los workers sacan trabajos con un reparto
+    ponderado suave (smooth weighted round-robin): con pesos 8:1 se atienden
+    hasta 8 trabajos interactivos por cada trabajo masivo, pero ningún carril
+    se queda sin servicio. Los lotes grandes se envían troceados, así que un
+    texto interactivo espera como mucho a que termine el trozo en curso.
+
+    Los carriles con peso 0 son de fondo: solo se atienden cuando ningún
+    carril con peso tiene trabajo, así que usan únicamente la capacidad ociosa.
+    """
+
+    def __init__(self, workers: int = 1, weights: Optional[Dict[str, int]] = None):
+        self.workers = workers
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        self._queues = {lane: deque() for lane in self.weights}
+        self._current = {lane: 0 for lane in self.weights}
+        self._condition = threading.Condition()
+        self._threads = []
+        self._running = False
+        self._busy = 0
+        self._paused = False
+        self._last_done = time.monotonic()
+        self.stats = {lane: {"completed": 0, "wait_ms": 0.0, "max_wait_ms": 0.0} for lane in self.weights}
+
+    def start(self):
+        """Arranca los hilos de inferencia (después del fork, en cada worker)."""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"inference-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None):
+        """Detiene los workers cuando terminan los trabajos ya encolados."""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, lane: str, fn: Callable, *args, **kwargs) -> Future:
+        """Encola un trabajo en un carril y devuelve un Future con su resultado."""
+        if lane not in self._queues:
+            raise ValueError(f"Carril desconocido: {lane}")
+
+        future = Future()
+        with self._condition:
+            if self._paused:
+                raise LanesPaused("Inferencia en pausa")
+            self._queues[lane].append((future, fn, args, kwargs, time.perf_counter()))
+            self._condition.notify()
+        return future
+
+    def _next_lane(self) -> Optional[str]:
+        """Elige el siguiente carril con el reparto ponderado suave entre los carriles con trabajo."""
+        active = [lane for lane, queue in self._queues.items() if queue and self.weights[lane] > 0]
+        if not active:
+            # Carriles de fondo, solo con los demás vacíos
+            return next((lane for lane, queue in self._queues.items() if queue), None)
+
+        total = 0
+        for lane in active:
+            self._current[lane] += self.weights[lane]
+            total += self.weights[lane]
+        chosen = max(active, key=lambda lane: self._current[lane])
+        self._current[chosen] -= total
+        return chosen
+
+    def _work(self):
+        while True:
+            with self._condition:
+                lane = self._next_lane()
+                while lane is None:
+                    if not self._running:
+                        return
+                    self._condition.wait()
+                    lane = self._next_lane()
+                future, fn, args, kwargs, enqueued_at = self._queues[lane].popleft()
+                self._busy += 1
+
+            if not future.set_running_or_notify_cancel():
+                with self._condition:
+                    self._busy -= 1
+                    self._condition.notify_all()
+                continue
+
+            wait_ms = (time.perf_counter() - enqueued_at) * 1000
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+            with self._condition:
+                self._busy -= 1
+                self._last_done = time.monotonic()
+                self._condition.notify_all()
+                stats = self.stats[lane]
+                stats["completed"] += 1
+                stats["wait_ms"] += wait_ms
+                stats["max_wait_ms"] = max(stats["max_wait_ms"], wait_ms)
+
+    @contextmanager
+    def exclusive(self):
+        """
+        Reserva la máquina para otra tarea (la calibración): rechaza los trabajos
+        nuevos con LanesPaused, espera a que terminen los encolados y en curso y
+        reanuda el servicio al salir.
+        """
+        with self._condition:
+            if self._paused:
+                raise LanesPaused("Inferencia ya en pausa")
+            self._paused = True
+            while self._busy or (self._threads and any(self._queues.values())):
+                self._condition.wait()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._paused = False
+                self._condition.notify_all()
+
+    def idle_seconds(self) -> float:
+        """Segundos desde el último trabajo terminado, o 0 si hay trabajos en cola o en curso."""
+        with self._condition:
+            if self._busy or any(self._queues.values()):
+                return 0.0
+            return time.monotonic() - self._last_done
+
+    def status(self) -> Dict:
+        """Longitud de cada cola y espera media y máxima por carril."""
+        with self._condition:
+            return {
+                lane: {
+                    "queued": len(self._queues[lane]),
+                    "completed": stats["completed"],
+                    "mean_wait_ms": stats["wait_ms"] / stats["completed"] if stats["completed"] else None,
+                    "max_wait_ms": stats["max_wait_ms"]
+                }
+                for lane, stats in self.stats.items()
+            }
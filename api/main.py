@@ -1,94 +1,202 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-import joblib
+from fastapi import FastAPI, HTTPException, Header, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel, Field
 import numpy as np
-from typing import Dict, Union
+from typing import Dict, Union, Optional, List, Literal
 import os
-from transformers import AutoModelForSequenceClassification, AutoTokenizer
+import asyncio
+import hmac
+import threading
+import time
 import torch
+from api.bundle import load_models, requested_bundle_path, BundleError
+from api.registry import ModelRegistry
+from api.prefilter import Prefilter, load_dataset
+from api import autotune
+from api.lanes import LaneScheduler, LanesPaused, INTERACTIVE, BULK, SHADOW
+from src.config import load_config
+from src import wire
 
 # Inicializar la aplicación FastAPI
 app = FastAPI(title="Detector de Odio API",
               description="API para detectar mensajes de odio con threshold personalizado",
               version="2.0.0")
 
+# Comprimir las respuestas grandes (lotes) si el cliente lo acepta
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
 # Constantes
 THRESHOLD = 0.59
+MAX_BATCH_SIZE = 10000
+WARMUP_TEXTS = ["Calentando el modelo", "This is a warmup comment"]
 
 
 # Paths
 base_path = os.path.dirname(os.path.abspath(__file__))
 models_path = os.path.join(base_path, "..", "models")
+data_path = os.path.join(base_path, "..", "data", "youtoxic_english_1000.csv")
+autotune_path = os.path.join(models_path, "autotune.json")
+
+# Mover el modelo a GPU si está disponible
+device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
 try:
-    # Cargar el modelo tradicional y sus componentes
-    model_path = os.path.join(models_path, "ensemble_model.pkl")
-    tfidf_path = os.path.join(models_path, "vectorizer_2.pkl")
-    selector_path = os.path.join(models_path, "feature_selector.pkl")
-    
-    traditional_model = joblib.load(model_path)
-    tfidf = joblib.load(tfidf_path)
-    selector = joblib.load(selector_path)
-    
-    # Cargar el modelo transformer
-    transformer_path = os.path.join(models_path)
-    transformer_model = AutoModelForSequenceClassification.from_pretrained(transformer_path)
-    tokenizer = AutoTokenizer.from_pretrained(transformer_path)
-    
-    # Mover el modelo a GPU si está disponible
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    transformer_model = transformer_model.to(device)
-    transformer_model.eval()  # Establecer el modelo en modo evaluación
-
-except FileNotFoundError as e:
+    # Cargar ambos modelos desde el paquete versionado (o los ficheros antiguos si no existe)
+    initial_models = load_models(models_path, device, default_threshold=THRESHOLD)
+
+except (FileNotFoundError, BundleError) as e:
     raise HTTPException(status_code=500, detail=f"Error cargando modelos: {e}")
 
-def get_hate_level(probability: float) -> str:
+def get_hate_level(probability: float, threshold: float = THRESHOLD) -> str:
     """Determina el nivel de odio basado en la probabilidad."""
-    if probability < THRESHOLD:
+    if probability < threshold:
         return "Sin mensaje de odio detectado"
     else:
         return "Mensaje de odio detectado"
 
-def get_transformer_prediction(text: str) -> tuple:
+def get_transformer_prediction(text: str, models: Optional[Dict] = None) -> tuple:
     """Obtiene la predicción usando el modelo transformer."""
+    models = models or registry.active
     try:
         # Tokenizar el texto
-        inputs = tokenizer(text, return_tensors="pt", truncation=True, max_length=512).to(device)
-        
+        inputs = models["tokenizer"](text, return_tensors="pt", truncation=True, max_length=512).to(device)
+
         # Obtener predicción
         with torch.no_grad():
-            outputs = transformer_model(**inputs)
+            outputs = models["transformer_model"](**inputs)
             probabilities = torch.softmax(outputs.logits, dim=1)
-            
+
         # Obtener probabilidad de la clase positiva
         hate_prob = probabilities[0][1].item()
-        prediction = 1 if hate_prob >= THRESHOLD else 0
-        
+        prediction = 1 if hate_prob >= models["threshold"] else 0
+
         return prediction, hate_prob
-    
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error en predicción transformer: {str(e)}")
 
-def get_traditional_prediction(text: str) -> tuple:
+def get_traditional_prediction(text: str, models: Optional[Dict] = None) -> tuple:
     """Obtiene la predicción usando el modelo tradicional."""
+    models = models or registry.active
     try:
-        text_vectorized = tfidf.transform([text])
-        if selector:
-            text_vectorized = selector.transform(text_vectorized)
-            
-        probabilities = traditional_model.predict_proba(text_vectorized)
+        text_vectorized = models["tfidf"].transform([text])
+        if models["selector"]:
+            text_vectorized = models["selector"].transform(text_vectorized)
+
+        probabilities = models["traditional_model"].predict_proba(text_vectorized)
         hate_prob = probabilities[0][1]
-        prediction = 1 if hate_prob >= THRESHOLD else 0
-        
+        prediction = 1 if hate_prob >= models["threshold"] else 0
+
         return prediction, hate_prob
-    
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en predicción tradicional: {str(e)}")
+
+def get_transformer_predictions(texts: List[str], models: Optional[Dict] = None) -> List[tuple]:
+    """Obtiene las predicciones de un lote de textos con el modelo transformer."""
+    models = models or registry.active
+    try:
+        inputs = models["tokenizer"](texts, return_tensors="pt", truncation=True, max_length=512,
+                                     padding=True).to(device)
+
+        with torch.no_grad():
+            outputs = models["transformer_model"](**inputs)
+            probabilities = torch.softmax(outputs.logits, dim=1)
+
+        hate_probs = probabilities[:, 1].tolist()
+        return [(1 if p >= models["threshold"] else 0, p) for p in hate_probs]
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en predicción transformer: {str(e)}")
+
+def get_traditional_predictions(texts: List[str], models: Optional[Dict] = None) -> List[tuple]:
+    """Obtiene las predicciones de un lote de textos con el modelo tradicional."""
+    models = models or registry.active
+    try:
+        texts_vectorized = models["tfidf"].transform(texts)
+        if models["selector"]:
+            texts_vectorized = models["selector"].transform(texts_vectorized)
+
+        hate_probs = models["traditional_model"].predict_proba(texts_vectorized)[:, 1].tolist()
+        return [(1 if p >= models["threshold"] else 0, p) for p in hate_probs]
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error en predicción tradicional: {str(e)}")
 
+def get_predictions(models: Dict, texts: List[str], model_type: str) -> List[tuple]:
+    """Obtiene las predicciones de un lote con el conjunto de modelos indicado."""
+    if model_type.lower() == "transformer":
+        return get_transformer_predictions(texts, models)
+    return get_traditional_predictions(texts, models)
+
+def get_prediction(models: Dict, text: str, model_type: str) -> tuple:
+    """Obtiene la predicción con el conjunto de modelos indicado."""
+    if model_type.lower() == "transformer":
+        return get_transformer_prediction(text, models)
+    return get_traditional_prediction(text, models)
+
+# Prefiltro de comentarios triviales (emojis, marcas de tiempo, enlaces...), desactivable con PREFILTER_ENABLED=0
+prefilter = Prefilter.from_file(os.path.join(models_path, "prefilter.json"))
+if load_config("PREFILTER_ENABLED") == "0":
+    prefilter.enabled = False
+
+# Conjunto de modelos activo, intercambiable en caliente; la puntuación en sombra
+# va al carril de fondo de las colas de inferencia (definidas más abajo)
+registry = ModelRegistry(initial_models, get_prediction,
+                         submit_job=lambda fn, *args: lanes.submit(SHADOW, fn, *args))
+# Sin más referencias, los modelos antiguos se liberan al cambiarlos
+del initial_models
+
+# Parámetros de inferencia (hilos y tamaño de lote) calibrados con `python -m api.autotune`
+inference_settings = autotune.load_settings(autotune_path)
+for configured_model_type in ("transformer", "traditional"):
+    autotune.apply_settings(configured_model_type,
+                            autotune.model_settings(inference_settings, configured_model_type),
+                            startup=True)
+autotune_lock = threading.Lock()
+# Segundos que se indican a los clientes en Retry-After mientras dura la calibración
+AUTOTUNE_RETRY_AFTER = 30
+
+def run_autotune(latency_bound_ms: float = autotune.DEFAULT_LATENCY_BOUND_MS,
+                 model_types: Optional[List[str]] = None,
+                 trial_seconds: float = autotune.DEFAULT_TRIAL_SECONDS) -> Dict:
+    """
+    Calibra los modelos con textos del dataset, guarda la configuración y la aplica.
+
+    Las pruebas cambian los hilos de todo el proceso, así que los carriles de
+    inferencia quedan en pausa mientras duran: las peticiones reciben 503.
+    """
+    global inference_settings
+    with autotune_lock, lanes.exclusive():
+        texts, _ = load_dataset(data_path, "IsToxic")
+        texts = texts[:autotune.SAMPLE_SIZE]
+        predictors = {
+            model_type: (lambda batch, model_type=model_type: get_predictions(registry.active, batch, model_type))
+            for model_type in (model_types or ["transformer", "traditional"])
+        }
+        config = autotune.autotune(predictors, texts, latency_bound_ms, trial_seconds, backend=device.type)
+
+        # Conservar la configuración de los modelos que no se han recalibrado
+        previous_models = (inference_settings or {}).get("models", {})
+        config["models"] = {**previous_models, **config["models"]}
+        autotune.save_settings(autotune_path, config)
+        inference_settings = config
+        return config
+
+# Colas de inferencia con prioridad: textos interactivos por delante de los análisis masivos
+lanes = LaneScheduler(
+    workers=int(load_config("INFERENCE_WORKERS") or 1),
+    weights={
+        INTERACTIVE: int(load_config("INTERACTIVE_LANE_WEIGHT") or 8),
+        BULK: int(load_config("BULK_LANE_WEIGHT") or 1),
+        SHADOW: 0
+    }
+)
+
 class PredictionRequest(BaseModel):
     text: str
     model_type: str = "transformer"  # "transformer" o "traditional"
+    priority: Optional[str] = None  # "interactive" (por defecto) o "bulk"
 
 class PredictionResponse(BaseModel):
     prediction: int
@@ -96,45 +204,299 @@ class PredictionResponse(BaseModel):
     hate_level: str
     details: Dict[str, Union[float, str]]
 
+class BatchPredictionRequest(BaseModel):
+    texts: List[str] = Field(..., max_length=MAX_BATCH_SIZE)
+    model_type: str = "transformer"  # "transformer" o "traditional"
+    priority: Optional[str] = None  # "bulk" (por defecto) o "interactive"
+
+class BatchPredictionResponse(BaseModel):
+    results: List[PredictionResponse]
+
+class AutotuneRequest(BaseModel):
+    latency_bound_ms: float = autotune.DEFAULT_LATENCY_BOUND_MS
+    model_types: Optional[List[Literal["transformer", "traditional"]]] = None  # por defecto, ambos modelos
+
+class ModelLoadRequest(BaseModel):
+    bundle_path: Optional[str] = None  # versión o ruta dentro de models/bundle/; por defecto, el paquete activo
+    mode: str = "swap"  # "swap" o "shadow"
+    sample_rate: float = 0.1  # fracción de tráfico puntuada en modo sombra
+
+@app.on_event("startup")
+def autotune_on_startup():
+    """Calibra al arrancar si se pide con AUTOTUNE_ON_STARTUP=1 y aún no hay configuración."""
+    if load_config("AUTOTUNE_ON_STARTUP") == "1" and not inference_settings:
+        run_autotune()
+
+@app.on_event("startup")
+def start_inference_workers():
+    # Los hilos se crean aquí y no al importar para que sobrevivan al fork de cada worker
+    lanes.start()
+
+@app.on_event("shutdown")
+def stop_inference_workers():
+    lanes.stop(timeout=30)
+
+def resolve_lane(requested: Optional[str], header: Optional[str], default: str) -> str:
+    """Carril de la petición: campo `priority`, cabecera X-Priority o el del endpoint."""
+    lane = (requested or header or default).lower()
+    if lane not in (INTERACTIVE, BULK):
+        raise HTTPException(status_code=400, detail="priority debe ser 'interactive' o 'bulk'")
+    return lane
+
+def timed_predictions(models: Dict, texts: List[str], model_type: str) -> tuple:
+    """Predice un lote y devuelve también la latencia media por texto."""
+    start = time.perf_counter()
+    predictions = get_predictions(models, texts, model_type)
+    return predictions, (time.perf_counter() - start) / len(texts)
+
+def build_response(models: Dict, model_type: str, prediction: int, hate_prob: float,
+                   prefilter_rule: Optional[str] = None) -> PredictionResponse:
+    """Construye la respuesta completa de una predicción."""
+    # Determinar nivel de odio
+    hate_level = get_hate_level(hate_prob, models["threshold"])
+
+    # Preparar detalles adicionales
+    details = {
+        "threshold_used": models["threshold"],
+        "raw_probability": float(hate_prob),
+        "confidence": f"{hate_prob * 100:.2f}%",
+        "model_used": model_type
+    }
+    if prefilter_rule:
+        details["prefilter_rule"] = prefilter_rule
+
+    return PredictionResponse(
+        prediction=prediction,
+        probability=float(hate_prob),
+        hate_level=hate_level,
+        details=details
+    )
+
+def inference_paused() -> HTTPException:
+    """Respuesta mientras la calibración tiene la inferencia en pausa."""
+    return HTTPException(status_code=503, detail="Calibración de la inferencia en curso",
+                         headers={"Retry-After": str(AUTOTUNE_RETRY_AFTER)})
+
+async def score_batch(models: Dict, texts: List[str], model_type: str, lane: str) -> List[tuple]:
+    """
+    Puntúa un lote: primero el prefiltro y el resto en trozos del tamaño calibrado.
+
+    Cada trozo es un trabajo independiente en el carril, así que las peticiones
+    interactivas se intercalan entre los trozos de un análisis masivo.
+
+    Returns:
+        Lista de (prediction, probability, prefilter_rule) en el orden de `texts`
+    """
+    results = [None] * len(texts)
+    pending = []
+    for i, text in enumerate(texts):
+        match = prefilter.match(text)
+        if match:
+            results[i] = (match.prediction, match.probability, match.rule)
+        else:
+            pending.append(i)
+
+    settings_key = "transformer" if model_type.lower() == "transformer" else "traditional"
+    batch_size = autotune.model_settings(inference_settings, settings_key)["batch_size"]
+    chunks = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+    outcomes = await asyncio.gather(*[
+        asyncio.wrap_future(lanes.submit(lane, timed_predictions, models, [texts[i] for i in chunk], model_type))
+        for chunk in chunks
+    ])
+
+    for chunk, (predictions, latency) in zip(chunks, outcomes):
+        for i, (prediction, hate_prob) in zip(chunk, predictions):
+            results[i] = (prediction, hate_prob, None)
+            registry.submit_shadow(texts[i], model_type, prediction, latency)
+
+    return results
+
 @app.post("/predict", response_model=PredictionResponse)
-def predict(request: PredictionRequest):
+async def predict(request: PredictionRequest, view: Optional[str] = None,
+                  accept: Optional[str] = Header(None), x_priority: Optional[str] = Header(None)):
+    # Formato de respuesta: completa (JSON), ligera (JSON) o MessagePack
+    fmt = wire.negotiate(accept, view)
+    lane = resolve_lane(request.priority, x_priority, INTERACTIVE)
     try:
-        # Seleccionar el modelo según el tipo especificado
-        if request.model_type.lower() == "transformer":
-            prediction, hate_prob = get_transformer_prediction(request.text)
+        # Tomar el conjunto activo una sola vez para toda la petición
+        models = registry.active
+
+        # Los comentarios triviales se clasifican sin pasar por el modelo
+        prefilter_match = prefilter.match(request.text)
+        if prefilter_match:
+            prediction, hate_prob = prefilter_match.prediction, prefilter_match.probability
         else:
-            prediction, hate_prob = get_traditional_prediction(request.text)
-        
-        # Determinar nivel de odio
-        hate_level = get_hate_level(hate_prob)
-        
-        # Preparar detalles adicionales
-        details = {
-            "threshold_used": THRESHOLD,
-            "raw_probability": float(hate_prob),
-            "confidence": f"{hate_prob * 100:.2f}%",
-            "model_used": request.model_type
-        }
-        
-        return PredictionResponse(
-            prediction=prediction,
-            probability=float(hate_prob),
-            hate_level=hate_level,
-            details=details
-        )
-        
+            # Seleccionar el modelo según el tipo especificado, en la cola de su carril
+            predictions, latency = await asyncio.wrap_future(
+                lanes.submit(lane, timed_predictions, models, [request.text], request.model_type)
+            )
+            prediction, hate_prob = predictions[0]
+
+            # Puntuar en sombra con el modelo candidato, sin esperar al resultado
+            registry.submit_shadow(request.text, request.model_type, prediction, latency)
+
+    except LanesPaused:
+        raise inference_paused()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error en la predicción: {str(e)}")
 
+    if fmt != wire.FULL:
+        content, media_type = wire.encode_single(fmt, prediction, float(hate_prob))
+        return Response(content=content, media_type=media_type)
+
+    return build_response(models, request.model_type, prediction, hate_prob,
+                          prefilter_match.rule if prefilter_match else None)
+
+@app.post("/predict/batch", response_model=BatchPredictionResponse)
+async def predict_batch(request: BatchPredictionRequest, view: Optional[str] = None,
+                        accept: Optional[str] = Header(None), x_priority: Optional[str] = Header(None)):
+    """Predice un lote de textos; en formato ligero o MessagePack la respuesta es columnar."""
+    fmt = wire.negotiate(accept, view)
+    lane = resolve_lane(request.priority, x_priority, BULK)
+    try:
+        models = registry.active
+        results = await score_batch(models, request.texts, request.model_type, lane)
+    except LanesPaused:
+        raise inference_paused()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en la predicción: {str(e)}")
+
+    if fmt == wire.FULL:
+        return BatchPredictionResponse(results=[
+            build_response(models, request.model_type, prediction, hate_prob, rule)
+            for prediction, hate_prob, rule in results
+        ])
+
+    content, media_type = wire.encode_batch(
+        fmt,
+        [prediction for prediction, _, _ in results],
+        [float(hate_prob) for _, hate_prob, _ in results],
+        request.model_type,
+        models["threshold"]
+    )
+    return Response(content=content, media_type=media_type)
+
+def check_admin_token(token: Optional[str]):
+    """Comprueba el token de administración configurado en ADMIN_TOKEN."""
+    expected = load_config("ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=403, detail="Administración deshabilitada: falta ADMIN_TOKEN")
+    if not token or not hmac.compare_digest(token.encode("utf-8"), expected.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="Token de administración inválido")
+
+def check_single_process():
+    """
+    Rechaza los cambios que solo afectarían al worker que atiende la petición.
+
+    `run.py --mode prod` marca con API_SUPERVISED=1 que hay varios procesos:
+    cargar, promocionar o recalibrar en uno de ellos dejaría a los demás (y a
+    los que se reinicien) con la versión anterior.
+    """
+    if load_config("API_SUPERVISED") == "1":
+        raise HTTPException(
+            status_code=409,
+            detail="La API corre con varios workers: cambia models/bundle/CURRENT o models/autotune.json "
+                   "y reinicia el servicio"
+        )
+
+@app.post("/admin/models/load", status_code=202)
+def load_model_version(request: ModelLoadRequest, x_admin_token: Optional[str] = Header(None)):
+    """Carga una versión de los modelos en segundo plano y la activa o la pone en sombra."""
+    check_admin_token(x_admin_token)
+    check_single_process()
+    if request.mode not in ("swap", "shadow"):
+        raise HTTPException(status_code=400, detail="mode debe ser 'swap' o 'shadow'")
+    if not 0 < request.sample_rate <= 1:
+        raise HTTPException(status_code=400, detail="sample_rate debe estar entre 0 y 1")
+    bundle_path = None
+    if request.bundle_path:
+        try:
+            bundle_path = requested_bundle_path(models_path, request.bundle_path)
+        except BundleError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    started = registry.load_in_background(
+        lambda: load_models(models_path, device, default_threshold=THRESHOLD,
+                            bundle_path=bundle_path),
+        mode=request.mode,
+        sample_rate=request.sample_rate,
+        warmup_texts=WARMUP_TEXTS
+    )
+    if not started:
+        raise HTTPException(status_code=409, detail="Ya hay una carga de modelos en curso")
+    return {"status": "loading", "mode": request.mode}
+
+@app.post("/admin/models/promote")
+def promote_shadow_model(x_admin_token: Optional[str] = Header(None)):
+    """Activa el modelo que se está evaluando en sombra."""
+    check_admin_token(x_admin_token)
+    check_single_process()
+    if not registry.promote_shadow():
+        raise HTTPException(status_code=404, detail="No hay ningún modelo en sombra")
+    return registry.status()
+
+@app.delete("/admin/models/shadow")
+def stop_shadow_model(x_admin_token: Optional[str] = Header(None)):
+    """Detiene la evaluación en sombra y descarta el candidato."""
+    check_admin_token(x_admin_token)
+    shadow = registry.stop_shadow()
+    if not shadow:
+        raise HTTPException(status_code=404, detail="No hay ningún modelo en sombra")
+    return shadow.summary()
+
+@app.get("/admin/models/status")
+def get_model_status(x_admin_token: Optional[str] = Header(None)):
+    check_admin_token(x_admin_token)
+    return registry.status()
+
+@app.post("/admin/autotune", status_code=202)
+def start_autotune(request: AutotuneRequest, x_admin_token: Optional[str] = Header(None)):
+    """
+    Lanza la calibración de los parámetros de inferencia en segundo plano.
+
+    Las pruebas cambian los hilos de todo el proceso, así que solo se permite
+    con las colas de inferencia ociosas durante AUTOTUNE_MIN_IDLE_SECONDS y,
+    mientras dura, las peticiones de predicción reciben 503.
+    """
+    check_admin_token(x_admin_token)
+    check_single_process()
+    if autotune_lock.locked():
+        raise HTTPException(status_code=409, detail="Ya hay una calibración en curso")
+    min_idle = float(load_config("AUTOTUNE_MIN_IDLE_SECONDS") or 60)
+    if lanes.idle_seconds() < min_idle:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Hay tráfico de inferencia; la calibración requiere {min_idle:.0f} s sin peticiones"
+        )
+
+    threading.Thread(
+        target=run_autotune,
+        args=(request.latency_bound_ms, request.model_types),
+        name="autotune",
+        daemon=True
+    ).start()
+    return {"status": "tuning"}
+
+@app.get("/health")
+def health():
+    """Disponibilidad: responde cuando el worker ha cargado los modelos y terminado el arranque."""
+    return {"status": "ok", "model_version": registry.active["version"]}
+
 @app.get("/info")
 def get_info():
+    threshold = registry.active["threshold"]
     return {
-        "model_version": "2.0",
+        "model_version": registry.active["version"],
         "available_models": ["transformer", "traditional"],
-        "threshold": THRESHOLD,
+        "threshold": threshold,
+        "inference_lanes": lanes.status(),
+        "inference_settings": {
+            model_type: autotune.model_settings(inference_settings, model_type)
+            for model_type in ("transformer", "traditional")
+        },
         "hate_levels": {
-            "Bajo": f"< {THRESHOLD}",
-            "Moderado": f"{THRESHOLD} - 0.69",
+            "Bajo": f"< {threshold}",
+            "Moderado": f"{threshold} - 0.69",
             "Alto": "0.70 - 0.84",
             "Muy Alto": "≥ 0.85"
         }
@@ -0,0 +1,253 @@
+# api/prefilter.py
+"""
+Prefiltro basado en reglas para comentarios triviales.
+
+Muchos comentarios de YouTube son solo emojis, marcas de tiempo ("2:31"), enlaces
+o frases benignas repetidas. El prefiltro los clasifica sin pasar por el modelo
+y deja pasar el resto. Las reglas y el léxico se configuran en models/prefilter.json.
+
+El léxico es una lista de frases permitidas, nunca de palabras prohibidas: un
+texto que no está en ella, en cualquier idioma, siempre pasa al modelo.
+
+Evaluación sobre el dataset incluido:
+    python -m api.prefilter evaluate
+    python -m api.prefilter evaluate --model transformer
+"""
+import argparse
+import csv
+import json
+import os
+import re
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_CONFIG = {
+    "enabled": True,
+    "probability": 0.0,
+    "rules": {
+        "empty": True,
+        "timestamp": True,
+        "url": True,
+        "no_letters": True,
+        "benign_phrase": True
+    },
+    # Frases benignas conocidas (se comparan normalizadas: minúsculas, sin signos ni emojis)
+    "benign_phrases": [
+        "first", "second", "nice", "nice video", "great video", "good video", "awesome video",
+        "amazing", "awesome", "cool", "wow", "lol", "lmao", "haha", "hahaha", "love this",
+        "love it", "i love this", "i love it", "love this song", "beautiful", "thanks",
+        "thank you", "thank you so much", "thanks for sharing", "great", "great job", "well said",
+        "so true", "true", "agreed", "same", "yes", "hello", "hi", "subscribed", "who is watching in",
+        "bravo", "congrats", "congratulations", "perfect", "brilliant", "excellent"
+    ]
+}
+
+# Los comentarios triviales son cortos; un texto más largo pasa al modelo sin aplicar las reglas
+MAX_RULE_LENGTH = 500
+# Patrones de un único token, sin repeticiones anidadas, para que el coste sea lineal
+TIMESTAMP_PATTERN = re.compile(r"\d{1,2}(?::\d{2}){1,2}")
+URL_PREFIX_PATTERN = re.compile(r"(?:https?://|www\.)\S+", re.IGNORECASE)
+URL_PART_PATTERN = re.compile(r"[^\W_]+")
+# Palabras de la estructura de los enlaces habituales, que no cuentan como texto
+URL_KEYWORDS = {
+    "www", "http", "https", "com", "org", "net", "youtube", "youtu", "watch", "shorts", "embed",
+    "channel", "playlist", "list", "live", "feature", "share", "index", "html", "php", "status"
+}
+NON_WORD_PATTERN = re.compile(r"[^\w\s']+")
+SPACES_PATTERN = re.compile(r"\s+")
+
+
+def strip_token(token: str) -> str:
+    """Quita los signos y emojis de los extremos de un token."""
+    start, end = 0, len(token)
+    while start < end and not token[start].isalnum():
+        start += 1
+    while end > start and not token[end - 1].isalnum():
+        end -= 1
+    return token[start:end]
+
+
+def is_timestamp_only(text: str) -> bool:
+    """Indica si el texto solo contiene marcas de tiempo ("2:31", "1:02:45"), signos y emojis."""
+    tokens = [strip_token(token) for token in text.split()]
+    tokens = [token for token in tokens if token]
+    return bool(tokens) and all(TIMESTAMP_PATTERN.fullmatch(token) for token in tokens)
+
+
+def url_has_text(url: str) -> bool:
+    """
+    Indica si un enlace lleva palabras en la ruta o la consulta (por ejemplo, un slug).
+
+    Los identificadores con cifras ("dQw4w9WgXcQ") y las palabras de la
+    estructura del enlace no cuentan; cualquier otra palabra sí, porque el
+    slug puede ser ofensivo.
+    """
+    address = url.split("://", 1)[-1]
+    host, _, rest = address.partition("/")
+    if "?" in host:
+        host, _, query = host.partition("?")
+        rest = f"?{query}{rest}"
+    return any(
+        part.isalpha() and len(part) >= 3 and part.lower() not in URL_KEYWORDS
+        for part in URL_PART_PATTERN.findall(rest)
+    )
+
+
+def is_bare_url_only(text: str) -> bool:
+    """Indica si el texto solo contiene enlaces sin palabras en la ruta."""
+    tokens = text.split()
+    return bool(tokens) and all(
+        URL_PREFIX_PATTERN.fullmatch(token) and not url_has_text(token) for token in tokens
+    )
+
+
+def normalize(text: str) -> str:
+    """Pasa a minúsculas, elimina signos y emojis y colapsa los espacios."""
+    text = NON_WORD_PATTERN.sub(" ", text.lower())
+    return SPACES_PATTERN.sub(" ", text).strip()
+
+
+class PrefilterMatch:
+    """Resultado de una regla del prefiltro."""
+
+    def __init__(self, rule: str, prediction: int, probability: float):
+        self.rule = rule
+        self.prediction = prediction
+        self.probability = probability
+
+
+class Prefilter:
+    """Clasifica comentarios triviales mediante patrones compilados y un léxico."""
+
+    def __init__(self, config: Optional[Dict] = None):
+        config = {**DEFAULT_CONFIG, **(config or {})}
+        self.enabled = config["enabled"]
+        self.probability = config["probability"]
+        self.rules = {**DEFAULT_CONFIG["rules"], **config.get("rules", {})}
+        self.benign_phrases = {normalize(p) for p in config["benign_phrases"]}
+
+    @classmethod
+    def from_file(cls, path: str) -> "Prefilter":
+        """Carga la configuración desde un JSON; si no existe, usa la configuración por defecto."""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def _benign(self, rule: str) -> PrefilterMatch:
+        return PrefilterMatch(rule, 0, self.probability)
+
+    def match(self, text: str) -> Optional[PrefilterMatch]:
+        """
+        Devuelve la regla que clasifica el texto o None si debe pasar al modelo.
+
+        Las reglas se aplican de la más barata a la más cara.
+        """
+        if not self.enabled:
+            return None
+
+        stripped = text.strip()
+        if self.rules["empty"] and not stripped:
+            return self._benign("empty")
+        if len(stripped) > MAX_RULE_LENGTH:
+            return None
+        if self.rules["timestamp"] and is_timestamp_only(stripped):
+            return self._benign("timestamp")
+        if self.rules["url"] and is_bare_url_only(stripped):
+            return self._benign("url")
+        # Letras de cualquier alfabeto (chino, árabe, devanagari...), no solo del latino
+        if self.rules["no_letters"] and not any(c.isalpha() for c in stripped):
+            return self._benign("no_letters")
+
+        normalized = normalize(stripped)
+        if self.rules["benign_phrase"] and normalized in self.benign_phrases:
+            return self._benign("benign_phrase")
+
+        return None
+
+
+def evaluate(prefilter: Prefilter, texts: List[str], labels: List[int],
+             predict_fn: Optional[Callable[[str], int]] = None) -> Dict:
+    """
+    Mide con qué frecuencia salta cada regla y cuántas veces discrepa de la etiqueta y del modelo.
+
+    Args:
+        prefilter: Prefiltro a evaluar
+        texts: Comentarios
+        labels: Etiqueta real de cada comentario (1 = odio)
+        predict_fn: Predicción del modelo para un texto (opcional)
+    """
+    triggers = Counter()
+    label_disagreements = Counter()
+    model_disagreements = Counter()
+    examples = {}
+
+    for text, label in zip(texts, labels):
+        result = prefilter.match(text)
+        if not result:
+            continue
+
+        triggers[result.rule] += 1
+        if result.prediction != label:
+            label_disagreements[result.rule] += 1
+            examples.setdefault(result.rule, text[:80])
+        if predict_fn and result.prediction != predict_fn(text):
+            model_disagreements[result.rule] += 1
+
+    total = len(texts)
+    triggered = sum(triggers.values())
+    report = {
+        "total": total,
+        "triggered": triggered,
+        "trigger_rate": triggered / total if total else 0.0,
+        "rules": {
+            rule: {
+                "triggers": count,
+                "label_disagreements": label_disagreements[rule],
+                "model_disagreements": model_disagreements[rule] if predict_fn else None
+            }
+            for rule, count in triggers.most_common()
+        },
+        "label_disagreement_examples": examples
+    }
+    return report
+
+
+def load_dataset(path: str, label_column: str) -> tuple:
+    """Lee los textos y etiquetas del CSV del dataset."""
+    texts, labels = [], []
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        for row in csv.DictReader(f):
+            texts.append(row["Text"])
+            labels.append(1 if row[label_column].strip().upper() == "TRUE" else 0)
+    return texts, labels
+
+
+def main():
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    root_path = os.path.join(base_path, "..")
+
+    parser = argparse.ArgumentParser(description="Prefiltro de comentarios triviales")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    evaluate_parser = subparsers.add_parser("evaluate", help="Evalúa el prefiltro sobre el dataset")
+    evaluate_parser.add_argument("--data", default=os.path.join(root_path, "data", "youtoxic_english_1000.csv"))
+    evaluate_parser.add_argument("--config", default=os.path.join(root_path, "models", "prefilter.json"))
+    evaluate_parser.add_argument("--label", default="IsToxic")
+    evaluate_parser.add_argument("--model", choices=["transformer", "traditional"],
+                                 help="Comparar también con las predicciones del modelo")
+    args = parser.parse_args()
+
+    prefilter = Prefilter.from_file(args.config)
+    texts, labels = load_dataset(args.data, args.label)
+
+    predict_fn = None
+    if args.model:
+        # Importación diferida: cargar los modelos solo si se pide la comparación
+        from api.main import registry, get_prediction
+        predict_fn = lambda text: get_prediction(registry.active, text, args.model)[0]
+
+    print(json.dumps(evaluate(prefilter, texts, labels, predict_fn), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+# api/registry.py
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ShadowScorer:
+    """
+    Puntúa en segundo plano una fracción del tráfico real con un modelo candidato.
+
+    Las peticiones nunca esperan al modelo sombra: el trabajo se encola aparte
+    (en la API, en el carril de fondo de las colas de inferencia, para no
+    quitarle hilos al modelo activo) y, si la cola está llena o no admite
+    trabajos, la muestra se descarta.
+    """
+
+    def __init__(self, models: Dict, predict_fn: Callable, sample_rate: float = 0.1,
+                 max_pending: int = 100, submit_job: Optional[Callable[..., Future]] = None):
+        """
+        Args:
+            models: Conjunto de modelos candidato
+            predict_fn: Función (models, text, model_type) -> (prediction, probability)
+            sample_rate: Fracción de peticiones que se puntúan con el candidato (0-1)
+            max_pending: Máximo de muestras pendientes antes de empezar a descartar
+            submit_job: Función (fn, *args) -> Future que ejecuta el trabajo (por defecto, un hilo propio)
+        """
+        self.models = models
+        self.predict_fn = predict_fn
+        self.sample_rate = sample_rate
+        self.max_pending = max_pending
+        self._executor = None
+        if submit_job is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+            submit_job = self._executor.submit
+        self._submit_job = submit_job
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.stats = {
+            "sampled": 0,
+            "scored": 0,
+            "agreements": 0,
+            "dropped": 0,
+            "errors": 0,
+            "primary_latency_ms": 0.0,
+            "shadow_latency_ms": 0.0
+        }
+
+    def submit(self, text: str, model_type: str, primary_prediction: int, primary_latency: float):
+        """Encola una muestra si entra en el muestreo; nunca bloquea."""
+        if random.random() >= self.sample_rate:
+            return
+
+        with self._lock:
+            self.stats["sampled"] += 1
+            if self._pending >= self.max_pending:
+                self.stats["dropped"] += 1
+                return
+            self._pending += 1
+
+        try:
+            self._submit_job(self._score, text, model_type, primary_prediction, primary_latency)
+        except RuntimeError:
+            # Cola detenida o en pausa (p. ej. durante la calibración)
+            with self._lock:
+                self._pending -= 1
+                self.stats["dropped"] += 1
+
+    def _score(self, text: str, model_type: str, primary_prediction: int, primary_latency: float):
+        start = time.perf_counter()
+        try:
+            prediction, _ = self.predict_fn(self.models, text, model_type)
+        except Exception as e:
+            logger.error(f"Error en la predicción del modelo sombra: {e}")
+            with self._lock:
+                self._pending -= 1
+                self.stats["errors"] += 1
+            return
+
+        latency = time.perf_counter() - start
+        with self._lock:
+            self._pending -= 1
+            self.stats["scored"] += 1
+            self.stats["agreements"] += int(prediction == primary_prediction)
+            self.stats["primary_latency_ms"] += primary_latency * 1000
+            self.stats["shadow_latency_ms"] += latency * 1000
+
+    def summary(self) -> Dict:
+        """Resumen de concordancia y latencias medias entre el modelo activo y el candidato."""
+        with self._lock:
+            stats = dict(self.stats)
+            pending = self._pending
+
+        scored = stats["scored"]
+        return {
+            "version": self.models["version"],
+            "sample_rate": self.sample_rate,
+            "sampled": stats["sampled"],
+            "scored": scored,
+            "pending": pending,
+            "dropped": stats["dropped"],
+            "errors": stats["errors"],
+            "agreement_rate": stats["agreements"] / scored if scored else None,
+            "mean_primary_latency_ms": stats["primary_latency_ms"] / scored if scored else None,
+            "mean_shadow_latency_ms": stats["shadow_latency_ms"] / scored if scored else None
+        }
+
+    def shutdown(self):
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ModelRegistry:
+    """
+    Mantiene el conjunto de modelos activo y permite cambiarlo sin reiniciar el proceso.
+
+    Cada petición toma una referencia a `active` al empezar, así que el cambio es
+    atómico: las peticiones en curso terminan con los modelos antiguos y las
+    nuevas usan ya los nuevos.
+    """
+
+    def __init__(self, models: Dict, predict_fn: Callable,
+                 submit_job: Optional[Callable[..., Future]] = None):
+        """
+        Args:
+            models: Conjunto de modelos inicial
+            predict_fn: Función (models, text, model_type) -> (prediction, probability)
+            submit_job: Dónde se ejecuta la puntuación en sombra (ver ShadowScorer)
+        """
+        self._active = models
+        self.predict_fn = predict_fn
+        self.submit_job = submit_job
+        self.shadow: Optional[ShadowScorer] = None
+        self._lock = threading.Lock()
+        self.loading: Optional[Dict] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def active(self) -> Dict:
+        return self._active
+
+    def swap(self, models: Dict) -> Dict:
+        """Sustituye el conjunto activo y devuelve el anterior."""
+        with self._lock:
+            previous, self._active = self._active, models
+        logger.info(f"Modelos {models['version']} activos (antes {previous['version']})")
+        return previous
+
+    def start_shadow(self, models: Dict, sample_rate: float):
+        self.stop_shadow()
+        self.shadow = ShadowScorer(models, self.predict_fn, sample_rate=sample_rate,
+                                   submit_job=self.submit_job)
+
+    def stop_shadow(self) -> Optional[ShadowScorer]:
+        shadow, self.shadow = self.shadow, None
+        if shadow:
+            shadow.shutdown()
+        return shadow
+
+    def promote_shadow(self) -> bool:
+        """Convierte el modelo sombra en el modelo activo."""
+        shadow = self.stop_shadow()
+        if not shadow:
+            return False
+        self.swap(shadow.models)
+        return True
+
+    def submit_shadow(self, text: str, model_type: str, primary_prediction: int, primary_latency: float):
+        shadow = self.shadow
+        if shadow:
+            shadow.submit(text, model_type, primary_prediction, primary_latency)
+
+    def warmup(self, models: Dict, texts: list):
+        """Ejecuta unas predicciones con ambos modelos antes de ponerlos en servicio."""
+        for model_type in ("transformer", "traditional"):
+            for text in texts:
+                self.predict_fn(models, text, model_type)
+
+    def load_in_background(self, loader: Callable[[], Dict], mode: str = "swap",
+                           sample_rate: float = 0.1, warmup_texts: Optional[list] = None) -> bool:
+        """
+        Carga un nuevo conjunto de modelos en un hilo aparte.
+
+        Args:
+            loader: Función que devuelve el conjunto de modelos cargado
+            mode: "swap" para activarlo al terminar o "shadow" para puntuar tráfico en sombra
+            sample_rate: Fracción de tráfico para el modo sombra
+            warmup_texts: Textos con los que calentar el modelo antes de usarlo
+
+        Returns:
+            bool: False si ya hay una carga en curso
+        """
+        with self._lock:
+            if self.loading:
+                return False
+            self.loading = {"mode": mode, "started_at": time.time()}
+            self.last_error = None
+
+        def run():
+            try:
+                models = loader()
+                self.warmup(models, warmup_texts or [])
+                if mode == "shadow":
+                    self.start_shadow(models, sample_rate)
+                else:
+                    self.swap(models)
+            except Exception as e:
+                logger.error(f"Error cargando modelos en segundo plano: {e}")
+                self.last_error = str(e)
+            finally:
+                with self._lock:
+                    self.loading = None
+
+        threading.Thread(target=run, name="model-loader", daemon=True).start()
+        return True
+
+    def status(self) -> Dict:
+        shadow = self.shadow
+        return {
+            "active_version": self._active["version"],
+            "threshold": self._active["threshold"],
+            "loading": self.loading,
+            "last_error": self.last_error,
+            "shadow": shadow.summary() if shadow else None
+        }
@@ -7,7 +7,7 @@ import httpx
 import requests
 from typing import Dict, Optional
 from datetime import datetime, timedelta
-from frontend.utils import local_css, remote_css
+from frontend.utils import local_css, remote_css, build_results_frame, filter_results, paginate_results
 from src.database import DatabaseManager
 
 # Añadimos el directorio `src` al sys.path
@@ -19,23 +19,27 @@ static_path = os.path.join(os.path.dirname(__file__), 'static', 'style.css')
 sys.path.append(src_path)
 
 from src.monitor import YouTubeMonitor
-from src.chart import create_gauge_chart
+from src.chart import create_gauge_chart, create_distribution_chart
 from src.config import load_config
+from src import wire
 
 # Acceder a las variables de configuración
 YOUTUBE_API_KEY = load_config("YOUTUBE_API_KEY")
 API_URL = load_config("API_URL")
 INFO_URL = load_config("INFO_URL")
+# Formato de respuesta para el análisis de videos: "json" (por defecto), "lean" o "msgpack"
+API_WIRE_FORMAT = load_config("API_WIRE_FORMAT") or wire.FULL
+BATCH_API_URL = load_config("BATCH_API_URL") or (f"{API_URL.rstrip('/')}/batch" if API_URL else None)
 
 # Símbolos de círculos
 GREEN_CIRCLE = "\U0001F7E2"  # 🟢
 RED_CIRCLE = "\U0001F534"    # 🔴
 
-async def fetch_analysis(api_url: str, text: str, model_type: str) -> dict:
+async def fetch_analysis(api_url: str, text: str, model_type: str, priority: str = "bulk") -> dict:
     """Realiza la solicitud a la API para analizar un comentario."""
     try:
         async with httpx.AsyncClient() as client:
-            response = await client.post(api_url, json={"text": text, "model_type": model_type})
+            response = await client.post(api_url, json={"text": text, "model_type": model_type, "priority": priority})
             if response.status_code == 200:
                 return response.json()
             return {"error": f"Error en la API: {response.status_code}", "detail": response.text}
@@ -53,9 +57,42 @@ async def analyze_comment(text: str, model_type: str) -> Optional[Dict]:
         st.error(f"Error analizando comentario: {e}")
         return None
 
-def display_comment_results(comment: Dict, analysis: Dict, index: int, video_id: str, db_manager: DatabaseManager):
-    """Muestra los resultados del análisis de un comentario y guarda en la base de datos."""
-    # Guardar el análisis en la base de datos según el tipo de modelo
+async def fetch_batch_analysis(api_url: str, texts: list, model_type: str) -> list:
+    """
+    Analiza un lote de comentarios pidiendo la respuesta columnar ligera o MessagePack.
+
+    Devuelve un análisis por texto con la misma forma que la respuesta completa
+    (prediction, probability y details con model_used y threshold_used).
+    """
+    fmt = wire.MSGPACK if API_WIRE_FORMAT == wire.MSGPACK and wire.msgpack else wire.LEAN
+    async with httpx.AsyncClient(timeout=None) as client:
+        response = await client.post(
+            api_url,
+            json={"texts": texts, "model_type": model_type, "priority": "bulk"},
+            headers={"Accept": wire.MEDIA_TYPES[fmt]}
+        )
+    if response.status_code != 200:
+        raise RuntimeError(f"Error en la API: {response.status_code} - {response.text}")
+
+    batch = wire.decode_batch(response.content, response.headers.get("content-type", ""))
+    details = {"model_used": batch["model_used"], "threshold_used": batch["threshold"]}
+    return [
+        {"prediction": prediction, "probability": probability, "details": details}
+        for prediction, probability in zip(batch["prediction"], batch["probability"])
+    ]
+
+async def analyze_comments(texts: list, model_type: str) -> list:
+    """Analiza varios comentarios en una sola petición a la API."""
+    if not texts:
+        return []
+    try:
+        return await fetch_batch_analysis(BATCH_API_URL, texts, model_type)
+    except Exception as e:
+        st.error(f"Error analizando comentarios: {e}")
+        return []
+
+def save_comment_analysis(comment: Dict, analysis: Dict, video_id: str, db_manager: DatabaseManager):
+    """Guarda el análisis de un comentario en la base de datos según el tipo de modelo."""
     if analysis['details'].get('model_used') == 'transformer':
         db_manager.save_analysis(
             video_id=video_id,
@@ -69,53 +106,128 @@ def display_comment_results(comment: Dict, analysis: Dict, index: int, video_id:
             traditional_result=analysis
         )
 
-    # Determinamos el color del círculo según el análisis
-    if analysis['prediction'] == 1:
-        comment_icon = RED_CIRCLE
-    else:
-        comment_icon = GREEN_CIRCLE
+def build_result_row(comment: Dict, analysis: Dict) -> Dict:
+    """Construye la fila de la tabla de resultados a partir de un comentario y su análisis."""
+    return {
+        'id': comment['id'],
+        'author': comment['author'],
+        'date': comment['date'],
+        'text': comment['text'],
+        'likes': comment['likes'],
+        'prediction': analysis['prediction'],
+        'probability': analysis['probability'],
+        'model_used': analysis['details'].get('model_used', 'transformer')
+    }
+
+def render_results(results_container, results: list, threshold: float, filters: Dict):
+    """
+    Muestra la tabla paginada de resultados y un único gráfico agregado.
+
+    Solo se envía al navegador la página seleccionada, por lo que el tiempo de
+    renderizado no depende del número total de comentarios analizados.
+    """
+    with results_container.container():
+        if not results:
+            st.info("Todavía no hay comentarios analizados.")
+            return
+
+        df = build_results_frame(results)
+        filtered = filter_results(
+            df,
+            label=filters['label'],
+            min_probability=filters['min_probability'],
+            search=filters['search'],
+            sort_by=filters['sort_by'],
+            ascending=filters['ascending']
+        )
 
-    # Fecha original en formato ISO 8601
-    date_string = comment['date']
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Comentarios analizados", len(df))
+        col2.metric("Con odio", int(df['prediction'].sum()))
+        col3.metric("Mostrados tras filtrar", len(filtered))
+
+        # Clave distinta en cada actualización para que Streamlit no lo trate como elemento duplicado
+        st.session_state.results_render_count = st.session_state.get('results_render_count', 0) + 1
+        st.plotly_chart(
+            create_distribution_chart(filtered['probability'].tolist(), threshold),
+            use_container_width=True,
+            key=f"results_distribution_{st.session_state.results_render_count}"
+        )
 
-    # Convertir la cadena a un objeto datetime
-    date_object = datetime.strptime(date_string, "%Y-%m-%dT%H:%M:%SZ")
+        page_size = filters['page_size']
+        total_pages = max(1, -(-len(filtered) // page_size))
+        page = min(filters['page'], total_pages)
+        page_df = paginate_results(filtered, page, page_size)
+
+        st.caption(f"Página {page} de {total_pages}")
+        st.dataframe(
+            page_df.assign(
+                prediction=page_df['prediction'].map({1: f"{RED_CIRCLE} Odio", 0: f"{GREEN_CIRCLE} Sin odio"}),
+                probability=page_df['probability'] * 100
+            ),
+            hide_index=True,
+            use_container_width=True,
+            column_order=["prediction", "probability", "author", "date", "text", "likes", "model_used"],
+            column_config={
+                "prediction": "Resultado",
+                "probability": st.column_config.ProgressColumn(
+                    "Probabilidad de odio", format="%.1f%%", min_value=0, max_value=100
+                ),
+                "author": "Autor",
+                "date": st.column_config.DatetimeColumn("Fecha", format="DD/MM/YYYY - HH:mm"),
+                "text": st.column_config.TextColumn("Comentario", width="large"),
+                "likes": "👍 Likes",
+                "model_used": "Modelo"
+            }
+        )
 
-    # Formatear la fecha al formato dd/mm/aaaa
-    formatted_date = date_object.strftime("%d/%m/%Y - %H:%M")
+def display_selected_comment(results: list, threshold: float, filters: Dict):
+    """Muestra el gauge solo para el comentario seleccionado de la página actual."""
+    if not results:
+        return
 
-    # Creamos un expander único para cada comentario con el ícono de color
-    with st.expander(f"{comment_icon} Comentario de {comment['author']} - {formatted_date}"):
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            unique_key_text = f"text_area_{comment['id']}_{index}_{time.time()}"
-            container = st.container(border=True)
-            container.write(
-                comment['text'],
-                key=unique_key_text
-            )
-
-            st.write(f"👍 Likes: {comment['likes']}")
-            
-            if analysis['prediction'] == 1:
-                st.error("⚠️ Se ha detectado contenido de odio")
-            else:
-                st.success("✅ No se ha detectado contenido de odio")
-            
-            st.info(f"🤖 Modelo utilizado: {analysis['details'].get('model_used', 'transformer').title()}")
-            
-        with col2:
-            fig = create_gauge_chart(
-                analysis['probability'],
-                analysis['details']['threshold_used']
-            )
-            
-            unique_key_gauge = f"gauge_chart_{comment['id']}_{index}_{time.time()}"
-            st.plotly_chart(fig, use_container_width=True, key=unique_key_gauge)
+    df = build_results_frame(results)
+    filtered = filter_results(
+        df,
+        label=filters['label'],
+        min_probability=filters['min_probability'],
+        search=filters['search'],
+        sort_by=filters['sort_by'],
+        ascending=filters['ascending']
+    )
+    page_df = paginate_results(filtered, filters['page'], filters['page_size'])
+    if page_df.empty:
+        return
+
+    rows = page_df.to_dict('records')
+    selected = st.selectbox(
+        "Ver detalle del comentario:",
+        range(len(rows)),
+        format_func=lambda i: f"{rows[i]['author']}: {rows[i]['text'][:80]}",
+        key="selected_comment"
+    )
+    comment = rows[selected]
+
+    col1, col2 = st.columns(2)
+    with col1:
+        container = st.container(border=True)
+        container.write(comment['text'])
+        st.write(f"👍 Likes: {comment['likes']}")
+
+        if comment['prediction'] == 1:
+            st.error("⚠️ Se ha detectado contenido de odio")
+        else:
+            st.success("✅ No se ha detectado contenido de odio")
+
+        st.info(f"🤖 Modelo utilizado: {comment['model_used'].title()}")
+
+    with col2:
+        fig = create_gauge_chart(comment['probability'], threshold)
+        st.plotly_chart(fig, use_container_width=True)
 
 async def get_new_comments(monitor: YouTubeMonitor, video_id: str, max_comments: int, processed_comments: set, 
-                          all_comments: list, status_container, model_type: str, db_manager: DatabaseManager):
+                          results: list, status_container, model_type: str, db_manager: DatabaseManager,
+                          results_container, filters: Dict):
     """Obtiene y procesa los comentarios más recientes de un video."""
     comments = monitor.get_comments(video_id, max_results=max_comments)
     
@@ -123,13 +235,22 @@ async def get_new_comments(monitor: YouTubeMonitor, video_id: str, max_comments:
         status_container.write(f"### Analizados los {len(comments)} comentarios más recientes")
         status_container.write(f"Última actualización: {datetime.now().strftime('%H:%M:%S')}")
                 
-        for i, comment in enumerate(comments):
-            if comment['id'] not in processed_comments:
-                analysis = await analyze_comment(comment['text'], model_type)
-                if analysis:
-                    processed_comments.add(comment['id'])
-                    all_comments.insert(0, comment)
-                    display_comment_results(comment, analysis, i, video_id, db_manager)
+        new_comments = [comment for comment in comments if comment['id'] not in processed_comments]
+        if API_WIRE_FORMAT in (wire.LEAN, wire.MSGPACK):
+            # Un único lote con respuesta compacta en lugar de una petición por comentario
+            analyses = await analyze_comments([comment['text'] for comment in new_comments], model_type)
+        else:
+            analyses = [await analyze_comment(comment['text'], model_type) for comment in new_comments]
+
+        for comment, analysis in zip(new_comments, analyses):
+            if analysis and 'error' not in analysis:
+                processed_comments.add(comment['id'])
+                save_comment_analysis(comment, analysis, video_id, db_manager)
+                results.append(build_result_row(comment, analysis))
+                st.session_state.threshold = analysis['details']['threshold_used']
+
+        # Un único renderizado por actualización, no uno por comentario
+        render_results(results_container, results, st.session_state.threshold, filters)
     else:
         status_container.write("No se encontraron comentarios.")
 
@@ -138,12 +259,26 @@ async def wait_for_next_update(interval: int):
     await asyncio.sleep(interval)
 
 async def process_comments(monitor: YouTubeMonitor, video_id: str, max_comments: int, processed_comments: set, 
-                         all_comments: list, status_container, monitor_interval: int, model_type: str, db_manager: DatabaseManager):
-    """Procesa los comentarios periódicamente."""
+                         results: list, status_container, monitor_interval: int, model_type: str, db_manager: DatabaseManager,
+                         results_container, filters: Dict, monitoring: Dict):
+    """
+    Procesa los comentarios periódicamente.
+
+    Cada cambio en los filtros vuelve a ejecutar el script: la hora de la última
+    consulta se guarda en `monitoring` para esperar lo que quede del intervalo en
+    lugar de volver a consultar YouTube (y gastar cuota) en cada interacción.
+    """
     while True:
+        last_poll = monitoring.get('last_poll')
+        if last_poll is not None:
+            remaining = last_poll + monitor_interval - time.time()
+            if remaining > 0:
+                status_container.write(f"Próxima actualización en {int(remaining)} seg.")
+                await wait_for_next_update(remaining)
+        monitoring['last_poll'] = time.time()
         await get_new_comments(monitor, video_id, max_comments, processed_comments, 
-                             all_comments, status_container, model_type, db_manager)
-        await wait_for_next_update(monitor_interval)
+                             results, status_container, model_type, db_manager,
+                             results_container, filters)
 
 def main():
     # Cargar configuración y CSS
@@ -157,11 +292,17 @@ def main():
     if not db_manager.connect():
         st.error("Error al conectar con la base de datos")
         return
-    db_manager.create_tables()
+    if db_manager.needs_migration():
+        st.warning("La tabla de resultados no está particionada: ejecuta `python -m src.maintenance --migrate` con la aplicación parada")
+    else:
+        db_manager.create_tables()
 
-    # Mantener un conjunto de comentarios procesados
-    processed_comments = set()
-    all_comments = []
+    # Mantener entre ejecuciones del script los comentarios procesados y sus resultados
+    if "video_results" not in st.session_state:
+        st.session_state.video_results = []
+        st.session_state.processed_comments = set()
+        st.session_state.monitoring = None
+        st.session_state.threshold = 0.59
 
     # Tabs para diferentes modos
     tab1, tab2, tab3 = st.tabs(["Análisis de Texto", "Análisis de Video", "Estadísticas"])
@@ -183,7 +324,7 @@ def main():
                     try:
                         response = requests.post(
                             API_URL, 
-                            json={"text": message, "model_type": model_type}
+                            json={"text": message, "model_type": model_type, "priority": "interactive"}
                         )
                         if response.status_code == 200:
                             analysis = response.json()
@@ -235,23 +376,84 @@ def main():
         with col3:
             monitor_interval = st.number_input("Intervalo de actualización (seg.)", min_value=10, max_value=30000, value=60)
 
-        if st.button("Analizar comentarios", type="secondary", key="analizar_video"):
+        col1, col2 = st.columns(2)
+        with col1:
+            start_monitoring = st.button("Analizar comentarios", type="secondary", key="analizar_video")
+        with col2:
+            stop_monitoring = st.button("Detener", key="detener_video")
+
+        if start_monitoring:
             if video_url:
                 try:
                     api_key = os.getenv('YOUTUBE_API_KEY')
-                    monitor = YouTubeMonitor(api_key)
-                    video_id = monitor.extract_video_id(video_url)
-                    
-                    asyncio.run(process_comments(
-                        monitor, video_id, max_comments, processed_comments,
-                        all_comments, status_container, monitor_interval, 
-                        model_type_video, db_manager
-                    ))
+                    video_id = YouTubeMonitor(api_key).extract_video_id(video_url)
+                    monitoring = st.session_state.monitoring
+                    if not monitoring or monitoring['video_id'] != video_id:
+                        st.session_state.video_results = []
+                        st.session_state.processed_comments = set()
+                    st.session_state.monitoring = {
+                        'video_id': video_id,
+                        'max_comments': max_comments,
+                        'monitor_interval': monitor_interval,
+                        'model_type': model_type_video
+                    }
                 except Exception as e:
                     st.error(f"Error: {str(e)}")
             else:
                 st.warning("⚠️ Por favor, ingresa una URL de YouTube válida.")
 
+        if stop_monitoring:
+            st.session_state.monitoring = None
+
+        # Filtros y ordenación aplicados en el servidor
+        with st.expander("Filtros y ordenación", expanded=True):
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                label_filter = st.selectbox("Mostrar", ["Todos", "Odio", "Sin odio"], key="filter_label")
+                search_filter = st.text_input("Buscar en comentario o autor", key="filter_search")
+            with col2:
+                min_probability = st.slider("Probabilidad mínima de odio (%)", 0, 100, 0, key="filter_min_prob")
+                sort_by = st.selectbox(
+                    "Ordenar por",
+                    ["date", "probability", "likes", "author"],
+                    format_func=lambda c: {"date": "Fecha", "probability": "Probabilidad",
+                                           "likes": "Likes", "author": "Autor"}[c],
+                    key="filter_sort_by"
+                )
+            with col3:
+                ascending = st.radio("Orden", ["Descendente", "Ascendente"], horizontal=True,
+                                     key="filter_order") == "Ascendente"
+                page_size = st.selectbox("Comentarios por página", [25, 50, 100, 250], key="filter_page_size")
+                page = st.number_input("Página", min_value=1, value=1, step=1, key="filter_page")
+
+        filters = {
+            'label': label_filter,
+            'min_probability': min_probability / 100,
+            'search': search_filter,
+            'sort_by': sort_by,
+            'ascending': ascending,
+            'page': page,
+            'page_size': page_size
+        }
+
+        results_container = st.empty()
+        render_results(results_container, st.session_state.video_results, st.session_state.threshold, filters)
+        display_selected_comment(st.session_state.video_results, st.session_state.threshold, filters)
+
+        # La monitorización se reanuda tras cada interacción con los filtros
+        monitoring = st.session_state.monitoring
+        if monitoring:
+            try:
+                monitor = YouTubeMonitor(os.getenv('YOUTUBE_API_KEY'))
+                asyncio.run(process_comments(
+                    monitor, monitoring['video_id'], monitoring['max_comments'],
+                    st.session_state.processed_comments, st.session_state.video_results,
+                    status_container, monitoring['monitor_interval'],
+                    monitoring['model_type'], db_manager, results_container, filters, monitoring
+                ))
+            except Exception as e:
+                st.error(f"Error: {str(e)}")
+
     with tab3:
         st.subheader("Estadísticas de Análisis")
         video_url_stats = st.text_input(
@@ -1,4 +1,5 @@
 import streamlit as st
+import pandas as pd
 
 def local_css(file_name):
     with open(file_name) as f:
@@ -10,4 +11,46 @@ def remote_css(url):
                     <!-- Material Icons -->
                     <link href="{url}" rel="stylesheet">
                 </head>
-                ''', unsafe_allow_html=True)   
\ No newline at end of file
+                ''', unsafe_allow_html=True)   
+
+# Columnas de la tabla de resultados del análisis de comentarios
+RESULT_COLUMNS = ["id", "author", "date", "text", "likes", "prediction", "probability", "model_used"]
+
+
+def build_results_frame(results: list) -> pd.DataFrame:
+    """Convierte la lista de resultados en un DataFrame con los tipos adecuados."""
+    df = pd.DataFrame(results, columns=RESULT_COLUMNS)
+    df["date"] = pd.to_datetime(df["date"], format="%Y-%m-%dT%H:%M:%SZ", errors="coerce")
+    df["probability"] = df["probability"].astype(float)
+    return df
+
+
+def filter_results(df: pd.DataFrame, label: str = "Todos", min_probability: float = 0.0,
+                   search: str = "", sort_by: str = "date", ascending: bool = False) -> pd.DataFrame:
+    """
+    Filtra y ordena los resultados en el servidor antes de enviarlos al navegador.
+
+    Args:
+        df: DataFrame de resultados
+        label: "Todos", "Odio" o "Sin odio"
+        min_probability: Probabilidad mínima de odio (0-1)
+        search: Texto a buscar en el comentario o el autor
+        sort_by: Columna por la que ordenar
+        ascending: Orden ascendente o descendente
+    """
+    mask = df["probability"] >= min_probability
+    if label == "Odio":
+        mask &= df["prediction"] == 1
+    elif label == "Sin odio":
+        mask &= df["prediction"] == 0
+    if search:
+        mask &= (df["text"].str.contains(search, case=False, regex=False)
+                 | df["author"].str.contains(search, case=False, regex=False))
+
+    return df[mask].sort_values(sort_by, ascending=ascending, kind="stable")
+
+
+def paginate_results(df: pd.DataFrame, page: int, page_size: int) -> pd.DataFrame:
+    """Devuelve solo las filas de la página solicitada (empezando en 1)."""
+    start = (max(page, 1) - 1) * page_size
+    return df.iloc[start:start + page_size]
@@ -1,37 +1,94 @@
+import argparse
+import os
+import signal
+import socket
 import subprocess
 import sys
-import os
 import time
+import urllib.request
 import webbrowser
 from pathlib import Path
 
+from src.config import load_config
+
 os.environ["PYTHONPATH"] = str(Path(".").resolve())
 
-def main():
+# Segundos que tiene cada worker para terminar las peticiones en curso tras SIGTERM
+GRACEFUL_TIMEOUT = 30
+# Tiempo máximo de carga de los modelos antes de dar la API por caída
+READY_TIMEOUT = 600
+# Un worker que muere antes de este tiempo cuenta como fallo de arranque (reinicio con espera creciente)
+MIN_UPTIME = 10
+MAX_RESTART_DELAY = 30
+# Hilos de torch por worker si no hay calibración
+DEFAULT_THREADS_PER_WORKER = 2
+# Workers mínimos al repartir las CPUs según la calibración (si hay CPUs suficientes)
+MIN_WORKERS = 2
+AUTOTUNE_PATH = Path("models") / "autotune.json"
+
+def is_ready(url: str) -> bool:
+    try:
+        with urllib.request.urlopen(url, timeout=2) as response:
+            return response.status == 200
+    except OSError:
+        return False
+
+def wait_until_ready(url: str, timeout: float = READY_TIMEOUT, processes=()) -> bool:
+    """Espera a que `url` responda 200; abandona si vence el tiempo o termina algún proceso vigilado."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if is_ready(url):
+            return True
+        if any(process.poll() is not None for process in processes):
+            return False
+        time.sleep(0.5)
+    return False
+
+def start_frontend(headless: bool = False) -> subprocess.Popen:
+    frontend_path = Path("frontend")
+    command = [sys.executable, "-m", "streamlit", "run", str(frontend_path / "app.py")]  # Especificar el archivo directamente
+    if headless:
+        command += ["--server.headless", "true"]
+    return subprocess.Popen(
+        command,
+        cwd="."  # Asegurar que el directorio raíz sea el contexto
+    )
+
+def health_url(host: str, port: int) -> str:
+    # Si la API escucha en todas las interfaces, se comprueba por localhost
+    host = "127.0.0.1" if host in ("0.0.0.0", "") else host
+    return f"http://{host}:{port}/health"
+
+def run_dev(args):
+    """Modo desarrollo: un único proceso de uvicorn con recarga automática."""
     # Paths
     api_path = Path("api")
-    frontend_path = Path("frontend")
-    
+
     # Iniciar la API
     print("Iniciando API...")
     api_process = subprocess.Popen(
-        [sys.executable, "-m", "uvicorn", "main:app", "--reload"],
+        [sys.executable, "-m", "uvicorn", "main:app", "--reload",
+         "--host", args.host, "--port", str(args.port)],
         cwd=str(api_path)  # Cambiar al directorio de la API
     )
-    
+
     # Esperar a que la API esté lista
-    time.sleep(5)
-    
+    if not wait_until_ready(health_url(args.host, args.port), processes=[api_process]):
+        print("La API no ha arrancado")
+        api_process.terminate()
+        sys.exit(1)
+
+    if args.no_frontend:
+        api_process.wait()
+        return
+
     # Iniciar Streamlit
     print("Iniciando aplicación Streamlit...")
-    frontend_process = subprocess.Popen(
-        [sys.executable, "-m", "streamlit", "run", str(frontend_path / "app.py")],  # Especificar el archivo directamente
-        cwd="."  # Asegurar que el directorio raíz sea el contexto
-    )
-    
+    frontend_process = start_frontend()
+
     # Abrir el navegador
     webbrowser.open("http://localhost:8501")
-    
+
     try:
         # Mantener el script corriendo
         api_process.wait()
@@ -42,5 +99,251 @@ def main():
         frontend_process.terminate()
         sys.exit(0)
 
+def plan_workers(requested: int = None) -> tuple:
+    """
+    Número de workers y de CPUs (hilos) que le tocan a cada uno.
+
+    Con `requested` se reparten las CPUs entre esos workers. Si no, cada worker
+    usa los hilos calibrados con `python -m api.autotune`, limitados a la mitad
+    de las CPUs: la calibración se mide en un único proceso y suele elegir todos
+    los núcleos, lo que dejaría un solo worker.
+    """
+    from api import autotune
+
+    cpus = autotune.available_cpus()
+    if requested:
+        return requested, max(1, cpus // requested)
+
+    tuned = autotune.model_settings(autotune.load_settings(str(AUTOTUNE_PATH)), "transformer")["torch_threads"]
+    threads = max(1, min(tuned or DEFAULT_THREADS_PER_WORKER, cpus // MIN_WORKERS))
+    return max(1, cpus // threads), threads
+
+def worker_settings(threads: int) -> dict:
+    """
+    Hilos de torch y de BLAS de un worker: los calibrados, sin pasar de su parte de las CPUs.
+
+    La calibración se mide en un único proceso con todos los núcleos; api.main
+    la aplica al importarse, antes del fork, así que cada worker la reduce a su parte.
+    """
+    from api import autotune
+
+    config = autotune.load_settings(str(AUTOTUNE_PATH))
+    torch_threads = autotune.model_settings(config, "transformer")["torch_threads"]
+    blas_threads = autotune.model_settings(config, "traditional")["blas_threads"]
+    return {
+        "transformer": {"torch_threads": min(torch_threads or threads, threads)},
+        "traditional": {"blas_threads": min(blas_threads or threads, threads)}
+    }
+
+def uses_cuda() -> bool:
+    """Indica si la API cargará los modelos en la GPU (el mismo criterio que api.main)."""
+    import torch
+    return torch.cuda.is_available()
+
+def calibrate():
+    """Calibra en un proceso aparte, antes de cargar los modelos en el proceso principal."""
+    if load_config("AUTOTUNE_ON_STARTUP") != "1" or AUTOTUNE_PATH.exists():
+        return
+    print("Calibrando la inferencia...")
+    subprocess.run([sys.executable, "-m", "api.autotune"], cwd=".")
+
+class Supervisor:
+    """
+    Mantiene N workers de uvicorn sobre un mismo socket.
+
+    La aplicación (y con ella los modelos) se importa una vez en el proceso
+    principal antes del fork, así que los workers comparten la memoria de los
+    modelos y arrancan sin volver a cargarlos. Los workers caídos se reinician;
+    con SIGTERM o SIGINT se reenvía SIGTERM a todos para que terminen las
+    peticiones en curso y, pasado GRACEFUL_TIMEOUT, se fuerza con SIGKILL.
+    """
+
+    def __init__(self, app, sock: socket.socket, workers: int, threads: int,
+                 graceful_timeout: float = GRACEFUL_TIMEOUT):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.threads = threads  # CPUs de cada worker
+        self.graceful_timeout = graceful_timeout
+        self.children = {}  # pid -> instante de arranque
+        self.restarts = []  # instantes en los que toca arrancar un worker de reemplazo
+        self.failures = 0
+        self.stopping = False
+        self.frontend = None
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            self._serve()
+        self.children[pid] = time.time()
+
+    def _serve(self):
+        status = 0
+        try:
+            # Grupo de procesos propio: Ctrl+C llega solo al supervisor, que decide cómo parar
+            os.setpgrp()
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+            import uvicorn
+            from api import autotune
+            for model_type, settings in worker_settings(self.threads).items():
+                autotune.apply_settings(model_type, settings)
+
+            config = uvicorn.Config(self.app, timeout_graceful_shutdown=self.graceful_timeout)
+            uvicorn.Server(config).run(sockets=[self.sock])
+        except BaseException as e:
+            print(f"Error en el worker {os.getpid()}: {e}", file=sys.stderr)
+            status = 1
+        finally:
+            os._exit(status)
+
+    def _request_stop(self, signum, frame):
+        self.stopping = True
+
+    def _reap(self):
+        """Recoge los workers terminados y programa su reemplazo."""
+        for pid in list(self.children):
+            try:
+                finished, status = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                finished, status = pid, None
+            if finished == 0:
+                continue
+            started_at = self.children.pop(pid)
+            if self.stopping:
+                continue
+
+            uptime = time.time() - started_at
+            self.failures = self.failures + 1 if uptime < MIN_UPTIME else 0
+            delay = min(2 ** self.failures, MAX_RESTART_DELAY) if self.failures else 0
+            print(f"Worker {pid} terminado (estado {status}); se reinicia en {delay} s")
+            self.restarts.append(time.time() + delay)
+
+    def run(self, frontend: bool = False, ready_url: str = None):
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+
+        for _ in range(self.workers):
+            self.spawn()
+        print(f"API en marcha con {self.workers} workers ({self.threads} hilos cada uno)")
+
+        while not self.stopping:
+            self._reap()
+            now = time.time()
+            for restart_at in [t for t in self.restarts if t <= now]:
+                self.restarts.remove(restart_at)
+                self.spawn()
+
+            if frontend and self.frontend is None:
+                # Streamlit solo arranca cuando la API responde
+                if is_ready(ready_url):
+                    print("Iniciando aplicación Streamlit...")
+                    self.frontend = start_frontend(headless=True)
+            elif self.frontend and self.frontend.poll() is not None:
+                print("Streamlit se ha detenido; reiniciando...")
+                self.frontend = start_frontend(headless=True)
+            time.sleep(0.5)
+
+        self.shutdown()
+
+    def shutdown(self):
+        print("\nDeteniendo servicios...")
+        if self.frontend:
+            self.frontend.terminate()
+        for pid in self.children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+        deadline = time.time() + self.graceful_timeout + 5
+        while self.children and time.time() < deadline:
+            self._reap()
+            time.sleep(0.2)
+
+        for pid in list(self.children):
+            print(f"Worker {pid} no ha terminado a tiempo; forzando la salida")
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        self.children.clear()
+        if self.frontend:
+            self.frontend.wait()
+
+def run_spawned_workers(args, workers: int):
+    """Workers lanzados por uvicorn desde cero: cada uno importa la aplicación y carga sus modelos."""
+    print(f"Iniciando API con {workers} workers...")
+    api_process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--workers", str(workers),
+         "--host", args.host, "--port", str(args.port),
+         "--timeout-graceful-shutdown", str(GRACEFUL_TIMEOUT)],
+        cwd="."
+    )
+    frontend_process = None
+    if not args.no_frontend and wait_until_ready(health_url(args.host, args.port), processes=[api_process]):
+        frontend_process = start_frontend(headless=True)
+    try:
+        api_process.wait()
+    except KeyboardInterrupt:
+        print("\nDeteniendo servicios...")
+        if frontend_process:
+            frontend_process.terminate()
+        api_process.terminate()
+        api_process.wait()
+
+def run_prod(args):
+    """Modo producción: varios workers con los modelos precargados y supervisión."""
+    calibrate()
+    # Con varios procesos, los cambios de modelo o de calibración por la API de
+    # administración solo llegarían a un worker: api.main los rechaza
+    os.environ["API_SUPERVISED"] = "1"
+
+    if uses_cuda():
+        # CUDA no admite fork tras inicializarse: cada worker carga su propia copia del modelo en la GPU
+        run_spawned_workers(args, args.workers or 1)
+        return
+
+    workers, threads = plan_workers(args.workers)
+    if not hasattr(os, "fork"):
+        # Sin fork (Windows), uvicorn lanza los workers por su cuenta y cada uno carga los modelos
+        run_spawned_workers(args, workers)
+        return
+
+    # Cargar la aplicación y los modelos una sola vez, antes del fork
+    print("Cargando modelos...")
+    from api.main import app, device
+
+    if device.type == "cuda":
+        sys.exit("Los modelos están en la GPU; no se pueden compartir entre workers con fork")
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    supervisor = Supervisor(app, sock, workers, threads)
+    supervisor.run(frontend=not args.no_frontend, ready_url=health_url(args.host, args.port))
+    sock.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Arranca la API y la aplicación Streamlit")
+    parser.add_argument("--mode", choices=["dev", "prod"], default=load_config("RUN_MODE") or "dev",
+                        help="dev: un proceso con recarga automática; prod: varios workers supervisados")
+    parser.add_argument("--workers", type=int, default=int(load_config("API_WORKERS") or 0) or None,
+                        help="Workers de la API en modo prod (por defecto, según las CPUs)")
+    parser.add_argument("--host", default=load_config("API_HOST") or "127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(load_config("API_PORT") or 8000))
+    parser.add_argument("--no-frontend", action="store_true", help="Arrancar solo la API")
+    args = parser.parse_args()
+
+    if args.mode == "prod":
+        run_prod(args)
+    else:
+        run_dev(args)
+
 if __name__ == "__main__":
     main()
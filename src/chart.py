@@ -25,3 +25,30 @@ def create_gauge_chart(probability: float, threshold: float) -> go.Figure:
     
     fig.update_layout(height=250)
     return fig
+
+def create_distribution_chart(probabilities: list, threshold: float, bin_size: int = 5) -> go.Figure:
+    """
+    Crea un histograma con la distribución de probabilidades de odio de todos los comentarios.
+
+    Los intervalos se calculan aquí, así que al navegador solo llegan 100 / bin_size barras
+    independientemente del número de comentarios.
+    """
+    counts = [0] * (100 // bin_size)
+    for probability in probabilities:
+        counts[min(int(probability * 100) // bin_size, len(counts) - 1)] += 1
+
+    fig = go.Figure(go.Bar(
+        x = [i * bin_size + bin_size / 2 for i in range(len(counts))],
+        y = counts,
+        width = bin_size * 0.95,
+        marker = {'color': "darkblue"}
+    ))
+
+    fig.add_vline(x = threshold * 100, line = {'color': "red", 'width': 3})
+    fig.update_layout(
+        height = 250,
+        title = {'text': "Distribución de la probabilidad de odio (%)"},
+        xaxis = {'range': [0, 100]},
+        yaxis = {'title': "Comentarios"}
+    )
+    return fig
@@ -1,10 +1,57 @@
 # src/database.py
 import os
+import gzip
+import re
 import psycopg2
+from psycopg2 import sql, errors
 from psycopg2.extras import DictCursor
-from typing import Optional, Dict
+from datetime import date
+from typing import Optional, Dict, List
 from src.config import load_config
 
+# Las particiones mensuales se llaman comment_analysis_yAAAAmMM
+PARTITION_PREFIX = "comment_analysis_"
+PARTITION_PATTERN = re.compile(r"^comment_analysis_y(\d{4})m(\d{2})$")
+
+
+def month_start(day: date) -> date:
+    """Devuelve el primer día del mes de la fecha indicada."""
+    return date(day.year, day.month, 1)
+
+
+def add_months(day: date, months: int) -> date:
+    """Suma (o resta) meses al primer día de un mes."""
+    month_index = day.year * 12 + day.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """Nombre de la partición mensual que empieza en `month`."""
+    return f"{PARTITION_PREFIX}y{month.year:04d}m{month.month:02d}"
+
+
+def parse_partition_name(name: str) -> Optional[date]:
+    """Devuelve el mes de una partición a partir de su nombre, o None si no es una partición mensual."""
+    match = PARTITION_PATTERN.match(name)
+    if not match:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+def expired_partitions(names: List[str], retention_months: int, today: Optional[date] = None) -> List[str]:
+    """
+    Particiones mensuales que quedan enteras fuera del periodo de retención.
+
+    Se conservan el mes actual y los `retention_months` anteriores; las demás
+    tablas (que no siguen el nombre de las particiones) nunca se devuelven.
+    """
+    cutoff = add_months(month_start(today or date.today()), -retention_months)
+    expired = []
+    for name in names:
+        month = parse_partition_name(name)
+        if month and add_months(month, 1) <= cutoff:
+            expired.append(name)
+    return expired
+
 class DatabaseManager:
     def __init__(self):
         """Inicializa la conexión a la base de datos usando las variables de configuración."""
@@ -35,28 +82,177 @@ class DatabaseManager:
         if self.connection:
             self.connection.close()
 
-    def create_tables(self):
-        """Crea la tabla de análisis si no existe."""
+    def create_tables(self, months_ahead: int = 3):
+        """
+        Crea la tabla de análisis particionada por meses, sus índices y las particiones próximas.
+
+        Si existe una tabla antigua sin particionar no se toca: la migración copia
+        toda la tabla y la bloquea mientras dura, así que se lanza aparte con
+        `python -m src.maintenance --migrate`.
+        """
+        try:
+            if self.needs_migration():
+                print("La tabla comment_analysis no está particionada: ejecuta python -m src.maintenance --migrate")
+                return False
+            self._create_schema(month_start(date.today()), months_ahead)
+            self.connection.commit()
+            return True
+        except psycopg2.Error as e:
+            print(f"Error creando la tabla: {e}")
+            self.connection.rollback()
+            return False
+
+    def migrate_legacy_table(self, months_ahead: int = 3) -> bool:
+        """
+        Migra la tabla antigua sin particionar a la tabla particionada, en una sola transacción.
+
+        Bloquea comment_analysis hasta terminar; conviene lanzarla con la aplicación parada.
+
+        Returns:
+            bool: True si se migró o no había nada que migrar
+        """
+        try:
+            if not self.needs_migration():
+                return True
+            self.cursor.execute("ALTER TABLE comment_analysis RENAME TO comment_analysis_legacy;")
+
+            first_month = month_start(date.today())
+            self.cursor.execute("SELECT MIN(created_at) AS oldest FROM comment_analysis_legacy;")
+            oldest = self.cursor.fetchone()['oldest']
+            if oldest:
+                first_month = min(first_month, month_start(oldest.date()))
+            self._create_schema(first_month, months_ahead)
+            self._copy_legacy_rows()
+
+            self.connection.commit()
+            return True
+        except psycopg2.Error as e:
+            print(f"Error migrando la tabla: {e}")
+            self.connection.rollback()
+            return False
+
+    def _create_schema(self, first_month: date, months_ahead: int):
+        """Tabla particionada, índices y particiones desde `first_month` (sin confirmar la transacción)."""
         create_table_query = """
         CREATE TABLE IF NOT EXISTS comment_analysis (
-            id SERIAL PRIMARY KEY,
+            id BIGSERIAL,
             video_id VARCHAR(50) NOT NULL,
             comment_id VARCHAR(100) NOT NULL,
             traditional_hate SMALLINT,
             transformer_hate SMALLINT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(video_id, comment_id)
-        );
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at);
         """
+        # Los índices del padre se crean automáticamente en cada partición
+        create_indexes_query = """
+        CREATE INDEX IF NOT EXISTS comment_analysis_video_comment_idx
+            ON comment_analysis (video_id, comment_id);
+        CREATE INDEX IF NOT EXISTS comment_analysis_created_at_idx
+            ON comment_analysis (created_at);
+        CREATE INDEX IF NOT EXISTS comment_analysis_video_stats_idx
+            ON comment_analysis (video_id, created_at) INCLUDE (traditional_hate, transformer_hate);
+        CREATE INDEX IF NOT EXISTS comment_analysis_traditional_hate_idx
+            ON comment_analysis (created_at) WHERE traditional_hate = 1;
+        CREATE INDEX IF NOT EXISTS comment_analysis_transformer_hate_idx
+            ON comment_analysis (created_at) WHERE transformer_hate = 1;
+        """
+        self.cursor.execute(create_table_query)
+        self.cursor.execute(create_indexes_query)
+        self._create_partitions(first_month, months_ahead)
+
+    def needs_migration(self) -> bool:
+        """Indica si comment_analysis existe como tabla normal (sin particionar)."""
+        self.cursor.execute("""
+        SELECT relkind FROM pg_class
+        WHERE relname = 'comment_analysis' AND relnamespace = 'public'::regnamespace;
+        """)
+        result = self.cursor.fetchone()
+        return bool(result) and result['relkind'] == 'r'
+
+    def _copy_legacy_rows(self):
+        """Copia los datos de la tabla antigua a la particionada y la elimina."""
+        self.cursor.execute("""
+        INSERT INTO comment_analysis (id, video_id, comment_id, traditional_hate, transformer_hate, created_at)
+        SELECT id, video_id, comment_id, traditional_hate, transformer_hate,
+               COALESCE(created_at, CURRENT_TIMESTAMP)
+        FROM comment_analysis_legacy;
+        """)
+        self.cursor.execute("""
+        SELECT setval(pg_get_serial_sequence('comment_analysis', 'id'),
+                      COALESCE((SELECT MAX(id) FROM comment_analysis), 0) + 1, false);
+        """)
+        self.cursor.execute("DROP TABLE comment_analysis_legacy;")
+
+    def _create_partitions(self, first_month: date, months_ahead: int):
+        last_month = add_months(month_start(date.today()), months_ahead)
+        month = first_month
+        while month <= last_month:
+            query = sql.SQL("""
+            CREATE TABLE IF NOT EXISTS {} PARTITION OF comment_analysis
+            FOR VALUES FROM (%s) TO (%s);
+            """).format(sql.Identifier(partition_name(month)))
+            self.cursor.execute(query, (month, add_months(month, 1)))
+            month = add_months(month, 1)
+
+    def ensure_partitions(self, months_ahead: int = 3) -> bool:
+        """Crea las particiones del mes actual y de los `months_ahead` meses siguientes."""
         try:
-            self.cursor.execute(create_table_query)
+            self._create_partitions(month_start(date.today()), months_ahead)
             self.connection.commit()
             return True
         except psycopg2.Error as e:
-            print(f"Error creando la tabla: {e}")
+            print(f"Error creando particiones: {e}")
             self.connection.rollback()
             return False
 
+    def list_partitions(self) -> List[str]:
+        """Devuelve los nombres de las particiones de comment_analysis."""
+        self.cursor.execute("""
+        SELECT child.relname AS name
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = 'comment_analysis'
+        ORDER BY child.relname;
+        """)
+        return [row['name'] for row in self.cursor.fetchall()]
+
+    def apply_retention(self, retention_months: int, archive_dir: Optional[str] = None) -> List[str]:
+        """
+        Elimina las particiones más antiguas que el periodo de retención.
+
+        Args:
+            retention_months: Meses completos que se conservan además del actual
+            archive_dir: Directorio donde archivar cada partición como CSV comprimido antes de borrarla (opcional)
+
+        Returns:
+            List[str]: Particiones eliminadas
+        """
+        dropped = []
+        try:
+            for name in expired_partitions(self.list_partitions(), retention_months):
+                if archive_dir:
+                    os.makedirs(archive_dir, exist_ok=True)
+                    archive_path = os.path.join(archive_dir, f"{name}.csv.gz")
+                    copy_query = sql.SQL("COPY (SELECT * FROM {}) TO STDOUT WITH (FORMAT csv, HEADER)").format(
+                        sql.Identifier(name)
+                    )
+                    with gzip.open(archive_path, 'wt', encoding='utf-8') as f:
+                        self.cursor.copy_expert(copy_query.as_string(self.connection), f)
+
+                self.cursor.execute(sql.SQL("ALTER TABLE comment_analysis DETACH PARTITION {};").format(
+                    sql.Identifier(name)
+                ))
+                self.cursor.execute(sql.SQL("DROP TABLE {};").format(sql.Identifier(name)))
+                # Confirmar partición a partición para no perder lo ya archivado si algo falla
+                self.connection.commit()
+                dropped.append(name)
+        except (psycopg2.Error, OSError) as e:
+            print(f"Error aplicando la retención: {e}")
+            self.connection.rollback()
+        return dropped
+
     def save_analysis(self, video_id: str, comment_id: str, 
                      traditional_result: Optional[Dict] = None,
                      transformer_result: Optional[Dict] = None) -> bool:
@@ -94,22 +290,35 @@ class DatabaseManager:
             print(f"Error actualizando el análisis: {e}")
             self.connection.rollback()
 
-        # Si no se actualizó, intentar insertar un nuevo registro
+        # Si no se actualizó, intentar insertar un nuevo registro. La tabla particionada no
+        # admite UNIQUE(video_id, comment_id), así que un bloqueo consultivo evita duplicados.
         insert_query = """
         INSERT INTO comment_analysis (video_id, comment_id, traditional_hate, transformer_hate)
-        VALUES (%s, %s, %s, %s)
-        ON CONFLICT (video_id, comment_id) DO NOTHING;
+        SELECT %s, %s, %s, %s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM comment_analysis WHERE video_id = %s AND comment_id = %s
+        );
         """
         
-        try:
-            self.cursor.execute(insert_query, 
-                              (video_id, comment_id, traditional_hate, transformer_hate))
-            self.connection.commit()
-            return True
-        except psycopg2.Error as e:
-            print(f"Error guardando el análisis: {e}")
-            self.connection.rollback()
-            return False
+        for attempt in range(2):
+            try:
+                self.cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s));",
+                                    (f"{video_id}/{comment_id}",))
+                self.cursor.execute(insert_query, 
+                                  (video_id, comment_id, traditional_hate, transformer_hate,
+                                   video_id, comment_id))
+                self.connection.commit()
+                return True
+            except errors.CheckViolation as e:
+                # No existe la partición del mes actual: crearla y reintentar una vez
+                self.connection.rollback()
+                if attempt or not self.ensure_partitions():
+                    print(f"Error guardando el análisis: {e}")
+                    return False
+            except psycopg2.Error as e:
+                print(f"Error guardando el análisis: {e}")
+                self.connection.rollback()
+                return False
 
     def get_analysis(self, video_id: str, comment_id: str) -> Optional[Dict]:
         """
@@ -151,4 +360,4 @@ class DatabaseManager:
             return dict(result) if result else None
         except psycopg2.Error as e:
             print(f"Error obteniendo estadísticas: {e}")
-            return None
\ No newline at end of file
+            return None
@@ -0,0 +1,58 @@
+# src/maintenance.py
+"""
+Mantenimiento periódico de la tabla comment_analysis.
+
+Crea las particiones de los próximos meses y aplica la retención: las particiones
+más antiguas que DB_RETENTION_MONTHS se archivan como CSV comprimido en
+DB_ARCHIVE_DIR (si está definido) y se eliminan. Pensado para lanzarse a diario
+desde cron o un programador de tareas:
+
+    python -m src.maintenance
+
+Si la base de datos tiene todavía la tabla antigua sin particionar, hay que
+migrarla una vez, con la aplicación parada (copia toda la tabla y la bloquea):
+
+    python -m src.maintenance --migrate
+"""
+import argparse
+from src.config import load_config
+from src.database import DatabaseManager
+
+DEFAULT_RETENTION_MONTHS = 12
+DEFAULT_MONTHS_AHEAD = 3
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mantenimiento de la tabla comment_analysis")
+    parser.add_argument("--retention-months", type=int,
+                        default=int(load_config("DB_RETENTION_MONTHS") or DEFAULT_RETENTION_MONTHS))
+    parser.add_argument("--archive-dir", default=load_config("DB_ARCHIVE_DIR"))
+    parser.add_argument("--months-ahead", type=int, default=DEFAULT_MONTHS_AHEAD)
+    parser.add_argument("--migrate", action="store_true",
+                        help="Migrar la tabla antigua sin particionar a la tabla particionada")
+    args = parser.parse_args()
+
+    db_manager = DatabaseManager()
+    if not db_manager.connect():
+        raise SystemExit(1)
+
+    try:
+        if args.migrate:
+            print("Migrando comment_analysis a la tabla particionada...")
+            if not db_manager.migrate_legacy_table(months_ahead=args.months_ahead):
+                raise SystemExit(1)
+
+        if not db_manager.create_tables(months_ahead=args.months_ahead):
+            raise SystemExit(1)
+
+        dropped = db_manager.apply_retention(args.retention_months, args.archive_dir)
+        if dropped:
+            print(f"Particiones eliminadas: {', '.join(dropped)}")
+        else:
+            print("No hay particiones fuera del periodo de retención")
+    finally:
+        db_manager.disconnect()
+
+
+if __name__ == "__main__":
+    main()
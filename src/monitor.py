@@ -3,6 +3,7 @@ import googleapiclient.discovery
 from typing import Optional
 import os
 import logging
+from src.youtube_cache import CachingHttp, DEFAULT_MAX_AGE
 
 # Configuración de logging
 logging.basicConfig(level=logging.INFO)
@@ -14,11 +15,25 @@ class YouTubeMonitor:
         if not self.api_key:
             raise ValueError("YouTube API key no encontrada")
             
+        # Caché en disco con peticiones condicionales (ETag) si se configura YOUTUBE_CACHE_DIR
+        cache_dir = os.getenv('YOUTUBE_CACHE_DIR')
+        self.http = CachingHttp(
+            cache_dir,
+            ttl=float(os.getenv('YOUTUBE_CACHE_TTL', 0)),
+            max_age=float(os.getenv('YOUTUBE_CACHE_MAX_AGE', DEFAULT_MAX_AGE))
+        ) if cache_dir else None
+
         self.youtube = googleapiclient.discovery.build(
             "youtube", "v3",
             developerKey=self.api_key,
-            cache_discovery=False
+            cache_discovery=False,
+            http=self.http
         )
+
+    @property
+    def last_request_cost(self) -> int:
+        """Unidades de cuota que costó la última petición de este hilo (0 si se sirvió desde la caché)."""
+        return self.http.last_request_cost if self.http else 1
         
     def extract_video_id(self, url: str) -> str:
         """Extrae el ID del video desde una URL de YouTube."""
@@ -0,0 +1,134 @@
+# src/monitor_service.py
+"""
+Servicio de monitorización continua de videos de YouTube.
+
+Consulta los videos con la planificación adaptativa de MonitorScheduler, puntúa
+los comentarios nuevos con el endpoint de lotes de la API (carril masivo) y
+guarda los resultados en PostgreSQL:
+
+    python -m src.monitor_service URL_O_ID [URL_O_ID ...] [--videos-file videos.txt]
+
+La planificación se guarda en MONITOR_SCHEDULE_PATH, así que al reiniciar el
+servicio se retoman los videos que ya se estaban monitorizando.
+"""
+import argparse
+import asyncio
+import logging
+import signal
+from typing import Dict, List
+
+import httpx
+
+from src import wire
+from src.config import load_config
+from src.database import DatabaseManager
+from src.monitor import YouTubeMonitor
+from src.scheduler import DEFAULT_DAILY_QUOTA, MonitorScheduler
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCHEDULE_PATH = "data/monitor_schedule.json"
+
+
+def batch_api_url() -> str:
+    api_url = load_config("API_URL") or "http://127.0.0.1:8000/predict"
+    return load_config("BATCH_API_URL") or f"{api_url.rstrip('/')}/batch"
+
+
+async def score_comments(client: httpx.AsyncClient, api_url: str, texts: List[str], model_type: str) -> List[Dict]:
+    """Puntúa un lote de comentarios con la respuesta columnar ligera (o MessagePack si está instalado)."""
+    fmt = wire.MSGPACK if wire.msgpack else wire.LEAN
+    response = await client.post(
+        api_url,
+        json={"texts": texts, "model_type": model_type, "priority": "bulk"},
+        headers={"Accept": wire.MEDIA_TYPES[fmt]}
+    )
+    response.raise_for_status()
+
+    batch = wire.decode_batch(response.content, response.headers.get("content-type", ""))
+    details = {"model_used": batch["model_used"], "threshold_used": batch["threshold"]}
+    return [
+        {"prediction": prediction, "probability": probability, "details": details}
+        for prediction, probability in zip(batch["prediction"], batch["probability"])
+    ]
+
+
+def read_videos(videos: List[str], videos_file: str = None) -> List[str]:
+    """Lista de URLs o IDs de la línea de comandos y, opcionalmente, de un fichero (uno por línea)."""
+    entries = list(videos)
+    if videos_file:
+        with open(videos_file, encoding="utf-8") as f:
+            entries += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    return entries
+
+
+async def run_service(args):
+    scheduler = MonitorScheduler(
+        schedule_path=args.schedule_path,
+        daily_quota=args.daily_quota,
+        max_concurrent=args.max_concurrent,
+        # Un cliente de YouTube por hilo: httplib2 no es seguro entre hilos
+        monitor_factory=YouTubeMonitor
+    )
+
+    parser_monitor = YouTubeMonitor()
+    for entry in read_videos(args.videos, args.videos_file):
+        video_id = parser_monitor.extract_video_id(entry)
+        if video_id not in scheduler.videos:
+            scheduler.watch(video_id, max_comments=args.max_comments)
+    if not scheduler.videos:
+        raise SystemExit("No hay videos que monitorizar")
+
+    db_manager = DatabaseManager()
+    if not db_manager.connect():
+        raise SystemExit(1)
+    # Un único cursor compartido: las escrituras van de una en una
+    db_lock = asyncio.Lock()
+    api_url = batch_api_url()
+
+    def save_results(video_id: str, comments: list, analyses: list):
+        for comment, analysis in zip(comments, analyses):
+            if args.model_type == "transformer":
+                db_manager.save_analysis(video_id=video_id, comment_id=comment["id"], transformer_result=analysis)
+            else:
+                db_manager.save_analysis(video_id=video_id, comment_id=comment["id"], traditional_result=analysis)
+
+    async with httpx.AsyncClient(timeout=None) as client:
+        async def on_comments(video_id: str, comments: list):
+            analyses = await score_comments(client, api_url, [c["text"] for c in comments], args.model_type)
+            async with db_lock:
+                await asyncio.to_thread(save_results, video_id, comments, analyses)
+            hateful = sum(1 for a in analyses if a["prediction"] == 1)
+            logger.info(f"{video_id}: {len(comments)} comentarios nuevos, {hateful} con odio")
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, scheduler.stop)
+            except NotImplementedError:  # Windows
+                pass
+
+        logger.info(f"Monitorizando {len(scheduler.videos)} videos")
+        try:
+            await scheduler.run(on_comments)
+        finally:
+            db_manager.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monitorización continua de comentarios de YouTube")
+    parser.add_argument("videos", nargs="*", help="URLs o IDs de los videos")
+    parser.add_argument("--videos-file", help="Fichero con una URL o ID por línea")
+    parser.add_argument("--model-type", choices=["transformer", "traditional"], default="transformer")
+    parser.add_argument("--max-comments", type=int, default=100)
+    parser.add_argument("--schedule-path", default=load_config("MONITOR_SCHEDULE_PATH") or DEFAULT_SCHEDULE_PATH)
+    parser.add_argument("--daily-quota", type=int,
+                        default=int(load_config("YOUTUBE_DAILY_QUOTA") or DEFAULT_DAILY_QUOTA))
+    parser.add_argument("--max-concurrent", type=int, default=4)
+    args = parser.parse_args()
+
+    asyncio.run(run_service(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+# src/scheduler.py
+import asyncio
+import json
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Coste en unidades de cuota de una llamada a commentThreads.list
+POLL_COST = 1
+# Cuota diaria por defecto de la YouTube Data API
+DEFAULT_DAILY_QUOTA = 10000
+# Número máximo de IDs de comentarios recordados por video
+MAX_SEEN_IDS = 500
+
+
+class VideoSchedule:
+    """Estado de monitorización de un video: intervalo, velocidad de comentarios y próxima consulta."""
+
+    def __init__(self, video_id: str, interval: float, next_poll: float,
+                 rate: float = 0.0, last_poll: Optional[float] = None,
+                 seen_ids: Optional[List[str]] = None, max_comments: int = 100):
+        self.video_id = video_id
+        self.interval = interval
+        self.next_poll = next_poll
+        self.rate = rate  # comentarios por segundo (media móvil exponencial)
+        self.last_poll = last_poll
+        self.seen_ids = list(seen_ids or [])
+        self.max_comments = max_comments
+        self.watchers = 1
+        # Consulta o procesamiento de comentarios en curso (no se persiste)
+        self.in_flight = False
+
+    def to_dict(self) -> Dict:
+        return {
+            'video_id': self.video_id,
+            'interval': self.interval,
+            'next_poll': self.next_poll,
+            'rate': self.rate,
+            'last_poll': self.last_poll,
+            'seen_ids': self.seen_ids[-MAX_SEEN_IDS:],
+            'max_comments': self.max_comments,
+            'watchers': self.watchers
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'VideoSchedule':
+        schedule = cls(
+            video_id=data['video_id'],
+            interval=data['interval'],
+            next_poll=data['next_poll'],
+            rate=data.get('rate', 0.0),
+            last_poll=data.get('last_poll'),
+            seen_ids=data.get('seen_ids'),
+            max_comments=data.get('max_comments', 100)
+        )
+        schedule.watchers = data.get('watchers', 1)
+        return schedule
+
+
+class MonitorScheduler:
+    """
+    Planificador que monitoriza muchos videos a la vez.
+
+    El intervalo de cada video se calcula a partir de la velocidad observada de
+    llegada de comentarios, todos los videos comparten un presupuesto global de
+    cuota de la API de YouTube y el estado se guarda en disco para poder
+    reanudar tras un reinicio.
+    """
+
+    def __init__(self, monitor=None, schedule_path: Optional[str] = None,
+                 daily_quota: int = DEFAULT_DAILY_QUOTA,
+                 min_interval: float = 10.0, max_interval: float = 3600.0,
+                 target_comments_per_poll: float = 20.0,
+                 smoothing: float = 0.3, max_concurrent: int = 4,
+                 clock: Callable[[], float] = time.time,
+                 monitor_factory: Optional[Callable[[], object]] = None,
+                 save_interval: float = 30.0):
+        """
+        Args:
+            monitor: Objeto con un método `get_comments(video_id, max_results)` (p. ej. YouTubeMonitor).
+                Un único cliente compartido no es seguro entre hilos, así que con él las consultas van de una en una
+            schedule_path: Fichero JSON donde se persiste la planificación (opcional)
+            daily_quota: Unidades de cuota diarias compartidas entre todos los videos
+            min_interval: Intervalo mínimo entre consultas de un video (seg.)
+            max_interval: Intervalo máximo entre consultas de un video (seg.)
+            target_comments_per_poll: Comentarios nuevos que se esperan por consulta
+            smoothing: Peso de la última medida en la media móvil de la velocidad
+            max_concurrent: Consultas simultáneas máximas a la API
+            clock: Función que devuelve la hora actual (inyectable para pruebas)
+            monitor_factory: Crea un cliente por hilo de consulta; necesario para consultar en paralelo
+            save_interval: Segundos mínimos entre dos guardados de la planificación durante el bucle
+        """
+        if monitor is None and monitor_factory is None:
+            raise ValueError("Se necesita un monitor o un monitor_factory")
+
+        self.monitor = monitor
+        self.monitor_factory = monitor_factory
+        self.save_interval = save_interval
+        self.schedule_path = schedule_path
+        self.daily_quota = daily_quota
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_comments_per_poll = target_comments_per_poll
+        self.smoothing = smoothing
+        self.max_concurrent = max_concurrent
+        self.clock = clock
+
+        self.videos: Dict[str, VideoSchedule] = {}
+        # Cubo de tokens para la cuota: se rellena a daily_quota / 86400 unidades por segundo
+        self.quota_capacity = max(float(POLL_COST), daily_quota / 24)
+        self.quota_tokens = self.quota_capacity
+        self.quota_updated = clock()
+        self.quota_spent = 0
+        self._running = False
+        self._wakeup: Optional[asyncio.Event] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._local = threading.local()
+        self._dirty = False
+        self._last_save = clock()
+
+        if schedule_path:
+            self.load()
+
+    # ------------------------------------------------------------------
+    # Gestión de videos
+    # ------------------------------------------------------------------
+    def watch(self, video_id: str, max_comments: int = 100) -> VideoSchedule:
+        """
+        Añade un video a la monitorización.
+
+        Las peticiones duplicadas sobre un mismo video se agrupan en una única
+        entrada: solo se cuenta un observador más.
+        """
+        schedule = self.videos.get(video_id)
+        if schedule:
+            schedule.watchers += 1
+            schedule.max_comments = max(schedule.max_comments, max_comments)
+            return schedule
+
+        schedule = VideoSchedule(
+            video_id=video_id,
+            interval=self.min_interval,
+            next_poll=self.clock(),
+            max_comments=max_comments
+        )
+        self.videos[video_id] = schedule
+        self.save()
+        if self._wakeup:
+            self._wakeup.set()
+        return schedule
+
+    def unwatch(self, video_id: str) -> bool:
+        """Retira un observador de un video. Devuelve True si el video deja de monitorizarse."""
+        schedule = self.videos.get(video_id)
+        if not schedule:
+            return False
+
+        schedule.watchers -= 1
+        if schedule.watchers > 0:
+            return False
+
+        del self.videos[video_id]
+        self.save()
+        return True
+
+    # ------------------------------------------------------------------
+    # Cálculo de intervalos y cuota
+    # ------------------------------------------------------------------
+    def quota_scale(self) -> float:
+        """
+        Factor por el que se alargan todos los intervalos para no superar la cuota diaria.
+
+        La demanda conjunta es la suma de las consultas por segundo que pide cada
+        video (coste / intervalo). Los videos inactivos piden poco y dejan su parte
+        de la cuota a los activos; solo si el total supera el ritmo de la cuota se
+        alargan todos en la misma proporción.
+        """
+        demand = sum(POLL_COST / s.interval for s in self.videos.values())
+        return max(1.0, demand * 86400 / self.daily_quota)
+
+    def compute_interval(self, schedule: VideoSchedule, new_comments: int, saturated: bool) -> float:
+        """
+        Calcula el siguiente intervalo de un video según su velocidad de comentarios.
+
+        Args:
+            schedule: Estado del video (con la velocidad ya actualizada)
+            new_comments: Comentarios nuevos encontrados en la última consulta
+            saturated: True si todos los comentarios devueltos eran nuevos (puede haber más)
+        """
+        if saturated:
+            # La página venía llena de comentarios nuevos: consultar cuanto antes
+            interval = self.min_interval
+        elif schedule.rate > 0:
+            interval = self.target_comments_per_poll / schedule.rate
+        else:
+            # Sin actividad: alejar las consultas progresivamente
+            interval = schedule.interval * 2
+
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def _refill_quota(self):
+        now = self.clock()
+        elapsed = max(0.0, now - self.quota_updated)
+        self.quota_tokens = min(self.quota_capacity,
+                                self.quota_tokens + elapsed * self.daily_quota / 86400)
+        self.quota_updated = now
+
+    def _take_quota(self, cost: float) -> bool:
+        self._refill_quota()
+        if self.quota_tokens < cost:
+            return False
+        self.quota_tokens -= cost
+        self.quota_spent += cost
+        return True
+
+    def _quota_wait(self, cost: float) -> float:
+        """Segundos hasta que haya cuota suficiente para una consulta."""
+        self._refill_quota()
+        missing = cost - self.quota_tokens
+        return max(0.0, missing * 86400 / self.daily_quota)
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+    def due_videos(self) -> List[VideoSchedule]:
+        """Devuelve los videos cuya próxima consulta ya ha vencido, del más atrasado al menos."""
+        now = self.clock()
+        due = [s for s in self.videos.values() if not s.in_flight and s.next_poll <= now]
+        return sorted(due, key=lambda s: s.next_poll)
+
+    def record_poll(self, schedule: VideoSchedule, comments: list) -> list:
+        """
+        Registra el resultado de una consulta y reprograma el video.
+
+        Returns:
+            list: Comentarios que no se habían visto antes
+        """
+        now = self.clock()
+        seen = set(schedule.seen_ids)
+        new_comments = [c for c in comments if c['id'] not in seen]
+        saturated = bool(comments) and len(new_comments) == len(comments) and schedule.last_poll is not None
+
+        if schedule.last_poll is not None:
+            elapsed = max(now - schedule.last_poll, 1e-6)
+            observed_rate = len(new_comments) / elapsed
+            schedule.rate = (self.smoothing * observed_rate
+                             + (1 - self.smoothing) * schedule.rate)
+
+        schedule.seen_ids.extend(c['id'] for c in new_comments)
+        schedule.seen_ids = schedule.seen_ids[-MAX_SEEN_IDS:]
+        schedule.last_poll = now
+        schedule.interval = self.compute_interval(schedule, len(new_comments), saturated)
+        schedule.next_poll = now + min(schedule.interval * self.quota_scale(), self.max_interval)
+        self._dirty = True
+        return new_comments
+
+    def _thread_monitor(self):
+        """Cliente de YouTube del hilo actual: httplib2 no es seguro entre hilos, así que cada uno tiene el suyo."""
+        if self.monitor_factory is None:
+            return self.monitor
+        monitor = getattr(self._local, 'monitor', None)
+        if monitor is None:
+            monitor = self._local.monitor = self.monitor_factory()
+        return monitor
+
+    def _fetch(self, schedule: VideoSchedule) -> tuple:
+        monitor = self._thread_monitor()
+        comments = monitor.get_comments(schedule.video_id, schedule.max_comments)
+        # El coste se lee en el mismo hilo y con el mismo cliente que hizo la petición
+        return comments, getattr(monitor, 'last_request_cost', POLL_COST)
+
+    async def poll(self, schedule: VideoSchedule) -> list:
+        """Consulta los comentarios de un video y devuelve los nuevos."""
+        loop = asyncio.get_running_loop()
+        comments, cost = await loop.run_in_executor(self._executor, self._fetch, schedule)
+        # Si la respuesta vino de la caché, devolver al presupuesto la cuota no gastada
+        if cost < POLL_COST:
+            self.quota_tokens = min(self.quota_capacity, self.quota_tokens + POLL_COST - cost)
+            self.quota_spent -= POLL_COST - cost
+
+        return self.record_poll(schedule, comments)
+
+    async def run(self, on_comments: Callable[[str, list], Awaitable[None]]):
+        """
+        Bucle principal: consulta los videos según su planificación.
+
+        Cada consulta es una tarea independiente, así que una consulta o un
+        `on_comments` lentos no retrasan a los demás videos.
+
+        Args:
+            on_comments: Corrutina que recibe (video_id, comentarios_nuevos) tras cada consulta
+        """
+        self._running = True
+        self._wakeup = asyncio.Event()
+        concurrency = self.max_concurrent if self.monitor_factory else 1
+        semaphore = asyncio.Semaphore(concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="youtube-poll")
+        tasks = set()
+
+        async def poll_and_notify(schedule: VideoSchedule):
+            # El video no vuelve a salir como pendiente hasta que se hayan procesado sus comentarios
+            try:
+                async with semaphore:
+                    try:
+                        new_comments = await self.poll(schedule)
+                    except Exception:
+                        # Reintentar tras el intervalo actual, no en la siguiente vuelta del bucle
+                        schedule.next_poll = self.clock() + schedule.interval
+                        raise
+                if new_comments:
+                    try:
+                        await on_comments(schedule.video_id, new_comments)
+                    except Exception:
+                        # Olvidar los comentarios no procesados para recuperarlos en la siguiente consulta
+                        failed_ids = {c['id'] for c in new_comments}
+                        schedule.seen_ids = [i for i in schedule.seen_ids if i not in failed_ids]
+                        raise
+            except Exception as e:
+                logger.error(f"Error consultando el video {schedule.video_id}: {e}")
+            finally:
+                schedule.in_flight = False
+                self._wakeup.set()
+
+        try:
+            while self._running:
+                quota_exhausted = False
+                for schedule in self.due_videos():
+                    if not self._take_quota(POLL_COST):
+                        quota_exhausted = True
+                        break
+                    schedule.in_flight = True
+                    task = asyncio.create_task(poll_and_notify(schedule))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+
+                self._save_if_due()
+
+                # Dormir hasta la próxima consulta o hasta que termine alguna en curso
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self._sleep_time(quota_exhausted))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            self._executor.shutdown(wait=False)
+            self._executor = None
+            self._wakeup = None
+            if self._dirty:
+                self.save()
+
+    def _sleep_time(self, quota_exhausted: bool) -> float:
+        if quota_exhausted:
+            return max(self._quota_wait(POLL_COST), 0.1)
+        # Los videos en curso despiertan el bucle al terminar
+        idle = [s.next_poll for s in self.videos.values() if not s.in_flight]
+        if not idle:
+            return self.min_interval
+        next_poll = min(idle)
+        return min(max(next_poll - self.clock(), 0.1), self.max_interval)
+
+    def stop(self):
+        """Detiene el bucle principal cuando terminan las consultas en curso."""
+        self._running = False
+        if self._wakeup:
+            self._wakeup.set()
+
+    # ------------------------------------------------------------------
+    # Persistencia
+    # ------------------------------------------------------------------
+    def _save_if_due(self):
+        """Guarda solo si algo ha cambiado y ha pasado `save_interval` desde el último guardado."""
+        if self._dirty and self.clock() - self._last_save >= self.save_interval:
+            self.save()
+
+    def save(self):
+        """Guarda la planificación en disco de forma atómica."""
+        self._dirty = False
+        self._last_save = self.clock()
+        if not self.schedule_path:
+            return
+
+        data = {
+            'saved_at': self.clock(),
+            'quota_tokens': self.quota_tokens,
+            'quota_spent': self.quota_spent,
+            'videos': [s.to_dict() for s in self.videos.values()]
+        }
+        tmp_path = f"{self.schedule_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.schedule_path)
+        except OSError as e:
+            logger.error(f"Error guardando la planificación: {e}")
+
+    def load(self):
+        """
+        Carga la planificación guardada.
+
+        Las consultas que vencieron mientras el proceso estaba parado (o sin
+        una próxima consulta válida) se escalonan a lo largo del intervalo
+        mínimo para no lanzarlas todas a la vez.
+        """
+        if not self.schedule_path or not os.path.exists(self.schedule_path):
+            return
+
+        try:
+            with open(self.schedule_path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Error cargando la planificación: {e}")
+            return
+
+        now = self.clock()
+        self.videos = {}
+        for entry in data.get('videos', []):
+            schedule = VideoSchedule.from_dict(entry)
+            self.videos[schedule.video_id] = schedule
+
+        overdue = sorted((s for s in self.videos.values()
+                          if not math.isfinite(s.next_poll) or s.next_poll < now),
+                         key=lambda s: s.next_poll if math.isfinite(s.next_poll) else now)
+        if overdue:
+            step = self.min_interval / len(overdue)
+            for i, schedule in enumerate(overdue):
+                schedule.next_poll = now + i * step
+
+        self.quota_tokens = min(self.quota_capacity, data.get('quota_tokens', self.quota_capacity))
+        self.quota_updated = data.get('saved_at', now)
+        self.quota_spent = data.get('quota_spent', 0)
+        self._refill_quota()
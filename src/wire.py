@@ -0,0 +1,109 @@
+# src/wire.py
+"""
+Formatos de respuesta de la API de predicción.
+
+    application/json                       respuesta completa (por defecto)
+    application/vnd.hateshield.lean+json   solo predicción y probabilidad
+    application/x-msgpack                  MessagePack; en lotes, formato columnar:
+                                           predicciones como bytes (1 por comentario) y
+                                           probabilidades como float32 little-endian (4 por comentario)
+
+Lo usan tanto la API como el cliente de Streamlit.
+"""
+import json
+import struct
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import msgpack
+except ImportError:  # sin msgpack se sirve JSON ligero en su lugar
+    msgpack = None
+
+FULL = "json"
+LEAN = "lean"
+MSGPACK = "msgpack"
+
+MEDIA_TYPES = {
+    FULL: "application/json",
+    LEAN: "application/vnd.hateshield.lean+json",
+    MSGPACK: "application/x-msgpack"
+}
+ACCEPTED_MEDIA_TYPES = {
+    "application/json": FULL,
+    "application/vnd.hateshield.lean+json": LEAN,
+    "application/x-msgpack": MSGPACK,
+    "application/msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK
+}
+
+
+def negotiate(accept: Optional[str], view: Optional[str] = None) -> str:
+    """
+    Elige el formato de respuesta a partir de la cabecera Accept y del parámetro `view`.
+
+    `view=lean` pide la respuesta ligera en JSON aunque el cliente no envíe Accept.
+    """
+    candidates = []
+    for position, part in enumerate((accept or "").split(",")):
+        media_type, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        fmt = ACCEPTED_MEDIA_TYPES.get(media_type.strip().lower())
+        if fmt and quality > 0:
+            candidates.append((-quality, position, fmt))
+
+    fmt = min(candidates)[2] if candidates else FULL
+    if fmt == MSGPACK and msgpack is None:
+        fmt = LEAN
+    if fmt == FULL and view == LEAN:
+        fmt = LEAN
+    return fmt
+
+
+def encode_single(fmt: str, prediction: int, probability: float) -> Tuple[bytes, str]:
+    """Codifica una predicción en formato ligero (JSON o MessagePack)."""
+    payload = {"prediction": prediction, "probability": probability}
+    if fmt == MSGPACK:
+        return msgpack.packb(payload), MEDIA_TYPES[MSGPACK]
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8"), MEDIA_TYPES[LEAN]
+
+
+def encode_batch(fmt: str, predictions: List[int], probabilities: List[float],
+                 model_type: str, threshold: float) -> Tuple[bytes, str]:
+    """
+    Codifica un lote en formato columnar: los datos comunes una sola vez y una columna por campo.
+    """
+    if fmt == MSGPACK:
+        payload = {
+            "model_used": model_type,
+            "threshold": threshold,
+            "count": len(predictions),
+            "prediction": bytes(predictions),
+            "probability": struct.pack(f"<{len(probabilities)}f", *probabilities)
+        }
+        return msgpack.packb(payload, use_bin_type=True), MEDIA_TYPES[MSGPACK]
+
+    payload = {
+        "model_used": model_type,
+        "threshold": threshold,
+        "prediction": predictions,
+        "probability": [round(p, 4) for p in probabilities]
+    }
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8"), MEDIA_TYPES[LEAN]
+
+
+def decode_batch(content: bytes, media_type: str) -> Dict:
+    """Decodifica una respuesta de lote ligera o MessagePack en listas de predicciones y probabilidades."""
+    if media_type.split(";")[0].strip() in ("application/x-msgpack", "application/msgpack", "application/vnd.msgpack"):
+        payload = msgpack.unpackb(content, raw=False)
+        count = payload["count"]
+        payload["prediction"] = list(payload["prediction"])
+        payload["probability"] = list(struct.unpack(f"<{count}f", payload["probability"]))
+        return payload
+    return json.loads(content)
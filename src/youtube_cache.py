@@ -0,0 +1,272 @@
+# src/youtube_cache.py
+import base64
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import httplib2
+
+try:
+    import fcntl
+except ImportError:  # Windows: el consumo de cuota solo se serializa dentro del proceso
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Coste en unidades de cuota de cada recurso de la YouTube Data API v3
+QUOTA_COSTS = {
+    "commentThreads": 1,
+    "comments": 1,
+    "videos": 1,
+    "channels": 1,
+    "search": 100
+}
+DEFAULT_QUOTA_COST = 1
+# Las entradas sin usar durante más de una semana se borran
+DEFAULT_MAX_AGE = 7 * 86400
+# Frecuencia máxima con la que se recorre el directorio buscando entradas caducadas
+PRUNE_INTERVAL = 3600
+
+# Un lock por fichero de cuota y proceso: cada YouTubeMonitor crea su propia instancia sobre el mismo directorio
+_quota_locks: Dict[str, threading.Lock] = {}
+_quota_locks_guard = threading.Lock()
+
+
+def _quota_lock(path: str) -> threading.Lock:
+    with _quota_locks_guard:
+        return _quota_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+class CachingHttp:
+    """
+    Transporte HTTP para el cliente de la API de YouTube con caché en disco.
+
+    Guarda cada respuesta GET en disco, indexada por la petición (sin la API key).
+    Las respuestas con menos de `ttl` segundos se sirven sin tocar la red y el
+    resto se revalidan con `If-None-Match`: si la página no ha cambiado, YouTube
+    responde 304 sin cuerpo y se devuelve la copia guardada. También registra las
+    unidades de cuota gastadas por video en un fichero compartido por todas las
+    instancias y procesos que usan el mismo directorio. Las entradas que llevan
+    más de `max_age` segundos sin usarse se borran.
+    """
+
+    def __init__(self, cache_dir: str, http=None, ttl: float = 0.0, revalidation_cost: Optional[int] = None,
+                 max_age: float = DEFAULT_MAX_AGE):
+        """
+        Args:
+            cache_dir: Directorio de la caché
+            http: Transporte real (por defecto httplib2.Http)
+            ttl: Segundos durante los que una respuesta se sirve sin revalidar
+            revalidation_cost: Unidades que se apuntan por una respuesta 304 (por defecto, el coste completo)
+            max_age: Segundos sin usarse tras los que se borra una entrada
+        """
+        self.cache_dir = cache_dir
+        self.http = http or httplib2.Http(timeout=30)
+        self.ttl = ttl
+        self.revalidation_cost = revalidation_cost
+        self.max_age = max_age
+        self.quota_path = os.path.join(cache_dir, "quota.json")
+        self.stats = {"fresh_hits": 0, "not_modified": 0, "misses": 0}
+        self._lock = threading.Lock()
+        # El coste de la última petición es de cada hilo: otro hilo puede estar usando la misma caché
+        self._local = threading.local()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.quota_usage = self._load_quota()
+        self.prune()
+
+    def __getattr__(self, name):
+        # Delegar el resto de atributos (timeout, close...) en el transporte real
+        if name in ("http", "_local"):
+            raise AttributeError(name)
+        return getattr(self.http, name)
+
+    @property
+    def last_request_cost(self) -> int:
+        """Unidades de cuota que costó la última petición de este hilo."""
+        return getattr(self._local, "cost", 0)
+
+    @last_request_cost.setter
+    def last_request_cost(self, cost: int):
+        self._local.cost = cost
+
+    # ------------------------------------------------------------------
+    # Claves y ficheros
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _parse(uri: str) -> tuple:
+        parts = urlsplit(uri)
+        query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != "key"]
+        return parts, sorted(query)
+
+    def cache_key(self, method: str, uri: str) -> str:
+        """Clave de la petición: método y URL con los parámetros ordenados y sin la API key."""
+        parts, query = self._parse(uri)
+        normalized = urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ""))
+        return hashlib.sha256(f"{method} {normalized}".encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read_entry(self, key: str) -> Optional[Dict]:
+        try:
+            with open(self._entry_path(key), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_entry(self, key: str, entry: Dict):
+        path = self._entry_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Error guardando la respuesta en caché: {e}")
+
+    def prune(self) -> int:
+        """Borra las entradas que llevan más de `max_age` segundos sin usarse. Devuelve cuántas se borraron."""
+        self._last_prune = time.time()
+        if not self.max_age:
+            return 0
+
+        removed = 0
+        cutoff = time.time() - self.max_age
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".json") or entry.name == "quota.json":
+                    continue
+                try:
+                    # Cada descarga o revalidación reescribe la entrada, así que basta con la fecha de modificación
+                    if entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                        removed += 1
+                except OSError:
+                    continue
+        if removed:
+            logger.info(f"Caché de YouTube: {removed} entradas caducadas eliminadas")
+        return removed
+
+    @staticmethod
+    def _to_response(entry: Dict) -> tuple:
+        headers = dict(entry["headers"])
+        headers["status"] = str(entry["status"])
+        content = base64.b64decode(entry["content"])
+        return httplib2.Response(headers), content
+
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    # ------------------------------------------------------------------
+    # Cuota
+    # ------------------------------------------------------------------
+    @contextmanager
+    def _quota_file_lock(self):
+        """Exclusión sobre quota.json entre hilos, instancias y procesos."""
+        with _quota_lock(self.quota_path):
+            with open(f"{self.quota_path}.lock", "a") as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load_quota(self) -> Dict:
+        try:
+            with open(self.quota_path, encoding="utf-8") as f:
+                usage = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # La cuota de YouTube se reinicia cada día: solo se conserva la del día actual
+        return usage if usage.get("date") == date.today().isoformat() else {}
+
+    def _record_quota(self, uri: str, units: int):
+        parts, query = self._parse(uri)
+        params = dict(query)
+        video_id = params.get("videoId") or params.get("id") or "_other"
+        today = date.today().isoformat()
+
+        # Leer, sumar y escribir bajo el lock: otras instancias pueden haber apuntado consumo entretanto
+        with self._quota_file_lock():
+            usage = self._load_quota()
+            if usage.get("date") != today:
+                usage = {"date": today, "videos": {}}
+            videos = usage.setdefault("videos", {})
+            videos[video_id] = videos.get(video_id, 0) + units
+            tmp_path = f"{self.quota_path}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(usage, f)
+                os.replace(tmp_path, self.quota_path)
+            except OSError as e:
+                logger.error(f"Error guardando el consumo de cuota: {e}")
+            self.quota_usage = usage
+
+    @staticmethod
+    def request_cost(uri: str) -> int:
+        resource = urlsplit(uri).path.rstrip("/").rsplit("/", 1)[-1]
+        return QUOTA_COSTS.get(resource, DEFAULT_QUOTA_COST)
+
+    def quota_for(self, video_id: str) -> int:
+        """Unidades de cuota gastadas hoy en un video (por cualquier instancia que use el directorio)."""
+        self.quota_usage = self._load_quota()
+        return self.quota_usage.get("videos", {}).get(video_id, 0)
+
+    # ------------------------------------------------------------------
+    # Interfaz de httplib2.Http
+    # ------------------------------------------------------------------
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        if method != "GET":
+            return self.http.request(uri, method=method, body=body, headers=headers, **kwargs)
+        if time.time() - self._last_prune > PRUNE_INTERVAL:
+            self.prune()
+
+        key = self.cache_key(method, uri)
+        entry = self._read_entry(key)
+        headers = dict(headers or {})
+
+        if entry and time.time() - entry["stored_at"] < self.ttl:
+            self._count("fresh_hits")
+            self.last_request_cost = 0
+            return self._to_response(entry)
+
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+
+        resp, content = self.http.request(uri, method=method, body=body, headers=headers, **kwargs)
+        cost = self.request_cost(uri)
+
+        if resp.status == 304 and entry:
+            self._count("not_modified")
+            cost = cost if self.revalidation_cost is None else self.revalidation_cost
+            entry["stored_at"] = time.time()
+            self._write_entry(key, entry)
+            self.last_request_cost = cost
+            self._record_quota(uri, cost)
+            return self._to_response(entry)
+
+        self._count("misses")
+        self.last_request_cost = cost
+        self._record_quota(uri, cost)
+
+        if resp.status == 200:
+            stored_headers = {k: v for k, v in resp.items() if k not in ("status", "content-location")}
+            self._write_entry(key, {
+                "status": resp.status,
+                "headers": stored_headers,
+                "etag": resp.get("etag"),
+                "stored_at": time.time(),
+                "content": base64.b64encode(content).decode("ascii")
+            })
+
+        return resp, content
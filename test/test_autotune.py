@@ -0,0 +1,55 @@
+import time  # Para simular el coste de inferencia.
+from api.autotune import benchmark, model_settings, select_best, thread_candidates  # Funciones que serán probadas.
+
+
+def test_thread_candidates_cover_all_cpus():
+    """
+    Verifica que se prueban potencias de dos y el número total de CPUs.
+    """
+    assert thread_candidates(1) == [1]
+    assert thread_candidates(6) == [1, 2, 4, 6]
+    assert thread_candidates(8) == [1, 2, 4, 8]
+
+
+def test_select_best_prefers_throughput_within_latency_bound():
+    """
+    Verifica que se elige la configuración más rápida que cumple el límite de latencia.
+    """
+    results = [
+        {"batch_size": 1, "throughput": 50, "p95_latency_ms": 20},
+        {"batch_size": 16, "throughput": 300, "p95_latency_ms": 90},
+        {"batch_size": 64, "throughput": 500, "p95_latency_ms": 400},
+    ]
+
+    assert select_best(results, latency_bound_ms=100)["batch_size"] == 16
+    # Si ninguna cumple el límite, se elige la de menor latencia.
+    assert select_best(results, latency_bound_ms=5)["batch_size"] == 1
+
+
+def test_benchmark_measures_throughput_and_latency():
+    """
+    Verifica que la medición recorre los textos en lotes y devuelve rendimiento y latencias.
+    """
+    batches = []
+
+    def predict_batch(batch):
+        batches.append(len(batch))
+        time.sleep(0.001)
+        return [(0, 0.1)] * len(batch)
+
+    result = benchmark(predict_batch, ["texto"] * 10, batch_size=4)
+
+    # Un lote de calentamiento y luego 4 + 4 + 2 textos.
+    assert batches == [4, 4, 4, 2]
+    assert result["throughput"] > 0
+    assert result["p95_latency_ms"] >= result["p50_latency_ms"] > 0
+
+
+def test_model_settings_fill_defaults():
+    """
+    Verifica que la configuración guardada se completa con los valores por defecto.
+    """
+    config = {"models": {"transformer": {"torch_threads": 4, "batch_size": 16}}}
+
+    assert model_settings(config, "transformer") == {"torch_threads": 4, "interop_threads": 1, "batch_size": 16}
+    assert model_settings(None, "traditional")["batch_size"] == 64
@@ -0,0 +1,109 @@
+import hashlib  # Para calcular los checksums del manifiesto.
+import json  # Para escribir el manifiesto a mano.
+import pytest  # Para comprobar las excepciones y omitir si faltan dependencias.
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+pytest.importorskip("safetensors")
+
+from api.bundle import (BundleError, CURRENT_NAME, FORMAT_VERSION, load_manifest,  # Importa las funciones que serán probadas.
+                        requested_bundle_path, resolve_bundle, verify_bundle)
+
+
+def write_bundle(path, files: dict, format_version: int = FORMAT_VERSION) -> dict:
+    """Crea un paquete mínimo con los ficheros indicados y su manifiesto."""
+    path.mkdir(parents=True, exist_ok=True)
+    manifest_files = {}
+    for name, content in files.items():
+        (path / name).parent.mkdir(parents=True, exist_ok=True)
+        (path / name).write_bytes(content)
+        manifest_files[name] = {"sha256": hashlib.sha256(content).hexdigest(), "size": len(content)}
+
+    manifest = {"format_version": format_version, "version": "3.0", "threshold": 0.6, "files": manifest_files}
+    (path / "manifest.json").write_text(json.dumps(manifest), encoding="utf-8")
+    return manifest
+
+
+def test_verify_accepts_intact_bundle(tmp_path):
+    """
+    Verifica que un paquete con los ficheros intactos se carga y se verifica.
+    """
+    bundle = tmp_path / "3.0"
+    write_bundle(bundle, {"traditional/ensemble.joblib": b"modelo", "transformer/config.json": b"{}"})
+
+    assert load_manifest(str(bundle))["version"] == "3.0"
+    assert verify_bundle(str(bundle))["threshold"] == 0.6
+
+
+def test_load_manifest_rejects_wrong_size_and_missing_files(tmp_path):
+    """
+    Verifica que se detectan los ficheros con otro tamaño o que faltan sin calcular checksums.
+    """
+    bundle = tmp_path / "3.0"
+    write_bundle(bundle, {"traditional/ensemble.joblib": b"modelo"})
+
+    (bundle / "traditional/ensemble.joblib").write_bytes(b"modelo truncado")
+    with pytest.raises(BundleError):
+        load_manifest(str(bundle))
+
+    (bundle / "traditional/ensemble.joblib").unlink()
+    with pytest.raises(FileNotFoundError):
+        load_manifest(str(bundle))
+
+
+def test_verify_rejects_checksum_mismatch(tmp_path):
+    """
+    Verifica que un fichero modificado con el mismo tamaño solo lo detecta la verificación completa.
+    """
+    bundle = tmp_path / "3.0"
+    write_bundle(bundle, {"traditional/ensemble.joblib": b"modelo"})
+    (bundle / "traditional/ensemble.joblib").write_bytes(b"MODELO")
+
+    load_manifest(str(bundle))
+    with pytest.raises(BundleError, match="Checksum"):
+        verify_bundle(str(bundle))
+
+
+def test_load_manifest_rejects_unsupported_format(tmp_path):
+    """
+    Verifica que no se cargan paquetes con una versión de formato desconocida.
+    """
+    bundle = tmp_path / "3.0"
+    write_bundle(bundle, {"traditional/ensemble.joblib": b"modelo"}, format_version=FORMAT_VERSION + 1)
+
+    with pytest.raises(BundleError, match="formato"):
+        load_manifest(str(bundle))
+
+
+def test_resolve_bundle_prefers_environment_over_current(tmp_path, monkeypatch):
+    """
+    Verifica que MODEL_BUNDLE tiene prioridad sobre models/bundle/CURRENT.
+    """
+    models_path = tmp_path / "models"
+    (models_path / "bundle").mkdir(parents=True)
+    monkeypatch.delenv("MODEL_BUNDLE", raising=False)
+
+    # Sin CURRENT no hay paquete activo.
+    assert resolve_bundle(str(models_path)) is None
+
+    (models_path / "bundle" / CURRENT_NAME).write_text("3.0\n", encoding="utf-8")
+    assert resolve_bundle(str(models_path)) == str(models_path / "bundle" / "3.0")
+
+    monkeypatch.setenv("MODEL_BUNDLE", "/srv/bundles/4.0")
+    assert resolve_bundle(str(models_path)) == "/srv/bundles/4.0"
+
+
+def test_requested_bundle_must_live_under_bundle_root(tmp_path):
+    """
+    Verifica que la API de administración solo acepta paquetes dentro de models/bundle/.
+    """
+    models_path = tmp_path / "models"
+    root = (models_path / "bundle").resolve()
+    root.mkdir(parents=True)
+
+    assert requested_bundle_path(str(models_path), "3.0") == str(root / "3.0")
+    assert requested_bundle_path(str(models_path), str(root / "3.0")) == str(root / "3.0")
+
+    for requested in ("../ensemble_model.pkl", "/tmp/evil", "3.0/../../..", "."):
+        with pytest.raises(BundleError):
+            requested_bundle_path(str(models_path), requested)
@@ -0,0 +1,32 @@
+import pytest  # Para omitir las pruebas si falta plotly.
+
+pytest.importorskip("plotly")
+
+from src.chart import create_distribution_chart  # Importa la función que será probada.
+
+
+def test_distribution_chart_bins_on_the_server():
+    """
+    Verifica que el histograma agrupa las probabilidades en intervalos antes de dibujarlas.
+    """
+    fig = create_distribution_chart([0.0, 0.01, 0.04, 0.05, 0.5, 0.99, 1.0], threshold=0.59)
+    bars = fig.data[0]
+
+    assert len(bars.x) == 20
+    assert sum(bars.y) == 7
+    assert bars.y[0] == 3    # 0, 1 y 4 %
+    assert bars.y[1] == 1    # 5 %
+    assert bars.y[10] == 1   # 50 %
+    # El 100 % cae en el último intervalo en lugar de salirse del rango.
+    assert bars.y[19] == 2
+
+
+def test_distribution_chart_marks_threshold():
+    """
+    Verifica que el umbral de decisión se dibuja como una línea vertical.
+    """
+    fig = create_distribution_chart([], threshold=0.59, bin_size=10)
+
+    assert len(fig.data[0].x) == 10
+    assert sum(fig.data[0].y) == 0
+    assert fig.layout.shapes[0].x0 == 59
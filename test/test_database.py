@@ -0,0 +1,48 @@
+from datetime import date  # Para construir los meses de las particiones.
+import pytest  # Para parametrizar y omitir si falta psycopg2.
+
+pytest.importorskip("psycopg2")
+
+from src.database import add_months, expired_partitions, month_start, parse_partition_name, partition_name  # Importa las funciones que serán probadas.
+
+
+@pytest.mark.parametrize("month, offset, expected", [
+    (date(2024, 11, 1), 1, date(2024, 12, 1)),
+    (date(2024, 12, 1), 1, date(2025, 1, 1)),
+    (date(2024, 11, 1), 14, date(2026, 1, 1)),
+    (date(2024, 1, 1), -1, date(2023, 12, 1)),
+    (date(2024, 3, 1), -15, date(2022, 12, 1)),
+    (date(2024, 5, 1), 0, date(2024, 5, 1)),
+])
+def test_add_months_rolls_over_years(month, offset, expected):
+    """
+    Verifica que sumar y restar meses cambia de año correctamente.
+    """
+    assert add_months(month, offset) == expected
+
+
+def test_partition_names_round_trip():
+    """
+    Verifica que el nombre de cada partición se genera y se interpreta de forma simétrica.
+    """
+    month = month_start(date(2025, 1, 17))
+
+    assert partition_name(month) == "comment_analysis_y2025m01"
+    assert parse_partition_name(partition_name(month)) == month
+    assert parse_partition_name("comment_analysis_default") is None
+    assert parse_partition_name("comment_analysis_y2025m1") is None
+
+
+def test_retention_keeps_current_and_previous_months():
+    """
+    Verifica el límite de la retención: se conservan el mes actual y los N anteriores.
+    """
+    names = [partition_name(date(2024, m, 1)) for m in range(1, 13)]
+    names += [partition_name(date(2025, 1, 1)), "comment_analysis_default"]
+
+    # 15 de enero de 2025 con 3 meses de retención: se conservan oct, nov, dic y ene.
+    expired = expired_partitions(names, 3, today=date(2025, 1, 15))
+
+    assert expired == [partition_name(date(2024, m, 1)) for m in range(1, 10)]
+    assert expired_partitions(names, 0, today=date(2025, 1, 1)) == names[:12]
+    assert expired_partitions(names, 24, today=date(2025, 1, 31)) == []
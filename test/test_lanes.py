@@ -0,0 +1,128 @@
+import threading  # Para bloquear un trabajo en curso.
+import time  # Para esperar a que el worker termine.
+import pytest  # Para comprobar las excepciones.
+from api.lanes import LaneScheduler, LanesPaused, INTERACTIVE, BULK, SHADOW  # Importa la clase que será probada.
+
+
+def test_submit_returns_result_and_propagates_errors():
+    """
+    Verifica que el Future devuelve el resultado del trabajo o la excepción que lanzó.
+    """
+    lanes = LaneScheduler()
+    lanes.start()
+    try:
+        assert lanes.submit(INTERACTIVE, lambda a, b: a + b, 2, b=3).result(timeout=2) == 5
+
+        def fail():
+            raise RuntimeError("fallo")
+
+        with pytest.raises(RuntimeError):
+            lanes.submit(BULK, fail).result(timeout=2)
+
+        status = lanes.status()
+        assert status[INTERACTIVE]["completed"] == 1
+        assert status[BULK]["completed"] == 1
+    finally:
+        lanes.stop(timeout=2)
+
+
+def test_unknown_lane_is_rejected():
+    """
+    Verifica que encolar en un carril inexistente lanza ValueError.
+    """
+    with pytest.raises(ValueError):
+        LaneScheduler().submit("urgent", print)
+
+
+def test_interactive_jobs_run_ahead_of_bulk():
+    """
+    Verifica que, con pesos 8:1, los trabajos interactivos se atienden antes
+    que la cola masiva sin dejarla sin servicio.
+    """
+    lanes = LaneScheduler(workers=1, weights={INTERACTIVE: 8, BULK: 1})
+    order = []
+    # Llenar las dos colas antes de arrancar el worker para que el orden sea determinista.
+    futures = [lanes.submit(BULK, order.append, f"b{i}") for i in range(3)]
+    futures += [lanes.submit(INTERACTIVE, order.append, f"i{i}") for i in range(16)]
+    lanes.start()
+    try:
+        for future in futures:
+            future.result(timeout=2)
+    finally:
+        lanes.stop(timeout=2)
+
+    # Un trabajo masivo por cada ocho interactivos, mientras haya trabajo en ambos carriles.
+    bulk_positions = [i for i, job in enumerate(order) if job.startswith("b")]
+    assert len(order) == 19
+    assert bulk_positions[0] < 9
+    assert len([i for i in bulk_positions if i < 18]) == 2
+    assert [job for job in order if job.startswith("i")] == [f"i{i}" for i in range(16)]
+
+
+def test_idle_seconds_is_zero_while_work_is_pending():
+    """
+    Verifica que el carril solo se considera ocioso cuando no hay trabajos en cola ni en curso.
+    """
+    lanes = LaneScheduler(workers=1)
+    release = threading.Event()
+    lanes.start()
+    try:
+        running = lanes.submit(BULK, release.wait, 2)
+        queued = lanes.submit(INTERACTIVE, lambda: None)
+        assert lanes.idle_seconds() == 0.0
+
+        release.set()
+        running.result(timeout=2)
+        queued.result(timeout=2)
+        # El worker marca el trabajo como terminado justo después de entregar el resultado.
+        deadline = time.monotonic() + 2
+        while lanes.idle_seconds() == 0.0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert lanes.idle_seconds() > 0.0
+    finally:
+        lanes.stop(timeout=2)
+
+
+def test_exclusive_drains_rejects_and_resumes():
+    """
+    Verifica que la reserva exclusiva espera a los trabajos en curso, rechaza
+    los nuevos mientras dura y reanuda el servicio al terminar.
+    """
+    lanes = LaneScheduler(workers=1)
+    release = threading.Event()
+    finished = []
+    lanes.start()
+    try:
+        running = lanes.submit(BULK, lambda: (release.wait(2), finished.append("bulk")))
+        threading.Timer(0.05, release.set).start()
+
+        with lanes.exclusive():
+            # El trabajo en curso terminó antes de entrar y no se admiten trabajos nuevos.
+            assert finished == ["bulk"]
+            with pytest.raises(LanesPaused):
+                lanes.submit(INTERACTIVE, lambda: None)
+
+        running.result(timeout=2)
+        assert lanes.submit(INTERACTIVE, lambda: 1).result(timeout=2) == 1
+    finally:
+        lanes.stop(timeout=2)
+
+
+def test_background_lane_only_uses_idle_capacity():
+    """
+    Verifica que un carril con peso 0 solo se atiende cuando los demás carriles están vacíos.
+    """
+    lanes = LaneScheduler(workers=1, weights={INTERACTIVE: 8, BULK: 1, SHADOW: 0})
+    order = []
+    futures = [lanes.submit(SHADOW, order.append, f"s{i}") for i in range(2)]
+    futures += [lanes.submit(BULK, order.append, "b0")]
+    futures += [lanes.submit(INTERACTIVE, order.append, f"i{i}") for i in range(3)]
+    lanes.start()
+    try:
+        for future in futures:
+            future.result(timeout=2)
+    finally:
+        lanes.stop(timeout=2)
+
+    assert order[-2:] == ["s0", "s1"]
+    assert sorted(order[:-2]) == ["b0", "i0", "i1", "i2"]
@@ -0,0 +1,104 @@
+import time  # Para acotar el tiempo de las entradas patológicas.
+import pytest  # Importa pytest para parametrizar las pruebas.
+from api.prefilter import Prefilter, evaluate  # Importa el prefiltro y su evaluación.
+
+
+@pytest.mark.parametrize("text, rule", [
+    ("   ", "empty"),
+    ("2:31", "timestamp"),
+    ("1:02:45 😂", "timestamp"),
+    ("https://www.youtube.com/watch?v=dQw4w9WgXcQ", "url"),
+    ("2:31, 14:05 🔥", "timestamp"),
+    ("😂😂😂", "no_letters"),
+    ("!!!", "no_letters"),
+    ("Nice video!!", "benign_phrase"),
+    ("Thank you 🙏", "benign_phrase"),
+    ("Bravo!", "benign_phrase"),
+    ("١٢٣ 😂", "no_letters"),
+])
+def test_trivial_comments_are_short_circuited(text, rule):
+    """
+    Verifica que los comentarios triviales se clasifican sin modelo y se indica la regla aplicada.
+    """
+    result = Prefilter().match(text)
+
+    assert result is not None
+    assert result.rule == rule
+    assert result.prediction == 0
+
+
+@pytest.mark.parametrize("text", [
+    "fuck",
+    "Idiots!",
+    "Muslims",
+    "Law enforcement is trained to shoot to kill.",
+    "2:31 look at this idiot",
+    # Un enlace con palabras en la ruta puede llevar el insulto en el slug.
+    "https://example.com/kill-all-of-them",
+    "www.example.com?q=idiots",
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ idiot",
+    # Insultos que no están en ningún léxico: una palabra desconocida nunca se da por benigna.
+    "kike",
+    "spic",
+    "chink",
+    "wetback",
+    "kys",
+    "Subhuman!",
+])
+def test_other_comments_go_to_the_model(text):
+    """
+    Verifica que las palabras sensibles y los comentarios con contenido pasan al modelo.
+    """
+    assert Prefilter().match(text) is None
+
+
+@pytest.mark.parametrize("text", [
+    "اقتلوا اليهود",
+    "你是个白痴",
+    "तुम बेवकूफ हो",
+    "Ты идиот",
+    "😡 바보",
+])
+def test_non_latin_text_goes_to_the_model(text):
+    """
+    Verifica que el texto en alfabetos no latinos no se toma por "sin letras".
+    """
+    assert Prefilter().match(text) is None
+
+
+def test_rules_can_be_disabled():
+    """
+    Verifica que la configuración permite desactivar reglas concretas o el prefiltro completo.
+    """
+    assert Prefilter({"rules": {"timestamp": False, "no_letters": False}}).match("2:31") is None
+    assert Prefilter({"enabled": False}).match("😂😂😂") is None
+
+
+def test_evaluate_reports_triggers_and_disagreements():
+    """
+    Verifica que la evaluación cuenta las reglas aplicadas y sus discrepancias con la etiqueta y el modelo.
+    """
+    texts = ["2:31", "Thanks!", "this is a long comment"]
+    labels = [0, 1, 0]
+
+    report = evaluate(Prefilter(), texts, labels, predict_fn=lambda text: 0)
+
+    assert report["triggered"] == 2
+    assert report["rules"]["timestamp"]["label_disagreements"] == 0
+    assert report["rules"]["benign_phrase"]["label_disagreements"] == 1
+    assert report["rules"]["benign_phrase"]["model_disagreements"] == 0
+
+
+@pytest.mark.parametrize("text", [
+    "1:11!!!!" * 10 + "x",
+    "http://a" * 20 + " b",
+    "1:11!!!!" * 5000 + "x",
+    "http://a " * 5000 + "b",
+])
+def test_pathological_inputs_are_linear(text):
+    """
+    Verifica que las reglas no sufren retroceso exponencial con entradas diseñadas para provocarlo.
+    """
+    start = time.perf_counter()
+    assert Prefilter().match(text) is None
+    assert time.perf_counter() - start < 0.1
@@ -0,0 +1,139 @@
+import threading  # Para sincronizar el modelo sombra simulado.
+import time  # Para esperar a los hilos en segundo plano.
+from unittest.mock import patch  # Para controlar el muestreo aleatorio.
+from api.registry import ModelRegistry  # Importa la clase que será probada.
+from api.lanes import LaneScheduler, SHADOW, INTERACTIVE  # Colas de inferencia donde corre el modelo sombra.
+
+
+def make_models(version: str, prediction: int) -> dict:
+    return {"version": version, "threshold": 0.59, "prediction": prediction}
+
+
+def fake_predict(models, text, model_type):
+    """Predicción simulada: devuelve la predicción fija del conjunto de modelos."""
+    return models["prediction"], 0.9 if models["prediction"] else 0.1
+
+
+def wait_until(condition, timeout: float = 2.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
+def test_load_in_background_swaps_after_warmup():
+    """
+    Verifica que la nueva versión se carga en segundo plano y solo se activa tras calentarla.
+    """
+    registry = ModelRegistry(make_models("1.0", 0), fake_predict)
+    release = threading.Event()
+
+    def loader():
+        release.wait()
+        return make_models("2.0", 1)
+
+    assert registry.load_in_background(loader, warmup_texts=["hola"]) is True
+    # Mientras carga se sigue sirviendo la versión anterior y no se admite otra carga.
+    assert registry.active["version"] == "1.0"
+    assert registry.load_in_background(loader) is False
+
+    release.set()
+    wait_until(lambda: registry.loading is None)
+    assert registry.active["version"] == "2.0"
+    assert registry.last_error is None
+
+
+def test_failed_load_keeps_active_models():
+    """
+    Verifica que un fallo en la carga no afecta a los modelos activos.
+    """
+    registry = ModelRegistry(make_models("1.0", 0), fake_predict)
+
+    def loader():
+        raise FileNotFoundError("no existe")
+
+    registry.load_in_background(loader)
+    wait_until(lambda: registry.loading is None)
+
+    assert registry.active["version"] == "1.0"
+    assert "no existe" in registry.last_error
+
+
+def test_shadow_scoring_records_agreement_and_promotes():
+    """
+    Verifica que el modelo sombra registra la concordancia con el activo y puede promocionarse.
+    """
+    registry = ModelRegistry(make_models("1.0", 0), fake_predict)
+    registry.start_shadow(make_models("2.0", 1), sample_rate=1.0)
+
+    with patch("api.registry.random.random", return_value=0.0):
+        registry.submit_shadow("texto", "transformer", primary_prediction=1, primary_latency=0.01)
+        registry.submit_shadow("texto", "transformer", primary_prediction=0, primary_latency=0.01)
+
+    wait_until(lambda: registry.shadow.summary()["scored"] == 2)
+    summary = registry.shadow.summary()
+    assert summary["agreement_rate"] == 0.5
+    assert summary["mean_primary_latency_ms"] > 0
+
+    assert registry.promote_shadow() is True
+    assert registry.active["version"] == "2.0"
+    assert registry.shadow is None
+
+
+def test_shadow_never_blocks_when_backlog_is_full():
+    """
+    Verifica que, si el modelo sombra va atrasado, las muestras se descartan en lugar de esperar.
+    """
+    release = threading.Event()
+
+    def slow_predict(models, text, model_type):
+        release.wait()
+        return 0, 0.1
+
+    registry = ModelRegistry(make_models("1.0", 0), slow_predict)
+    registry.start_shadow(make_models("2.0", 0), sample_rate=1.0)
+    registry.shadow.max_pending = 2
+
+    start = time.perf_counter()
+    with patch("api.registry.random.random", return_value=0.0):
+        for _ in range(5):
+            registry.submit_shadow("texto", "traditional", primary_prediction=0, primary_latency=0.01)
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.5
+    assert registry.shadow.summary()["dropped"] == 3
+    release.set()
+    registry.stop_shadow()
+
+
+def test_shadow_runs_in_the_background_lane():
+    """
+    Verifica que la puntuación en sombra se ejecuta en el carril de fondo de las
+    colas de inferencia y que, si no admiten trabajos, la muestra se descarta.
+    """
+    lanes = LaneScheduler(workers=1, weights={INTERACTIVE: 8, SHADOW: 0})
+    threads = []
+
+    def predict(models, text, model_type):
+        threads.append(threading.current_thread().name)
+        return models["prediction"], 0.5
+
+    registry = ModelRegistry(make_models("1.0", 0), predict,
+                             submit_job=lambda fn, *args: lanes.submit(SHADOW, fn, *args))
+    registry.start_shadow(make_models("2.0", 0), sample_rate=1.0)
+    lanes.start()
+    try:
+        with patch("api.registry.random.random", return_value=0.0):
+            registry.submit_shadow("texto", "transformer", primary_prediction=0, primary_latency=0.01)
+            wait_until(lambda: registry.shadow.summary()["scored"] == 1)
+
+            with lanes.exclusive():
+                registry.submit_shadow("texto", "transformer", primary_prediction=0, primary_latency=0.01)
+    finally:
+        lanes.stop(timeout=2)
+
+    assert threads == ["inference-0"]
+    assert lanes.status()[SHADOW]["completed"] == 1
+    summary = registry.shadow.summary()
+    assert summary["dropped"] == 1
+    assert summary["pending"] == 0
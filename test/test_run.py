@@ -0,0 +1,128 @@
+import json  # Para escribir una calibración de prueba.
+import pytest  # Importa pytest para las fixtures.
+
+pytest.importorskip("dotenv")  # run.py lee la configuración del .env al importarse.
+import run  # Importa el módulo que será probado.
+from api import autotune  # Para simular las CPUs disponibles.
+
+
+@pytest.fixture
+def cpus(monkeypatch, tmp_path):
+    """Fija las CPUs disponibles y apunta la calibración a un fichero temporal."""
+    monkeypatch.setattr(run, "AUTOTUNE_PATH", tmp_path / "autotune.json")
+
+    def set_cpus(count, torch_threads=None, blas_threads=None):
+        monkeypatch.setattr(autotune, "available_cpus", lambda: count)
+        if torch_threads or blas_threads:
+            config = {"models": {"transformer": {"torch_threads": torch_threads},
+                                 "traditional": {"blas_threads": blas_threads}}}
+            (tmp_path / "autotune.json").write_text(json.dumps(config), encoding="utf-8")
+
+    return set_cpus
+
+
+def test_requested_workers_split_the_cpus(cpus):
+    """
+    Verifica que con un número de workers pedido las CPUs se reparten entre ellos,
+    aunque la calibración haya elegido más hilos.
+    """
+    cpus(16, torch_threads=16)
+
+    assert run.plan_workers(4) == (4, 4)
+    assert run.plan_workers(3) == (3, 5)
+    assert run.plan_workers(32) == (32, 1)
+
+
+def test_single_process_calibration_does_not_collapse_the_pool(cpus):
+    """
+    Verifica que una calibración que elige todos los núcleos no deja un solo worker.
+    """
+    cpus(16, torch_threads=16)
+    assert run.plan_workers() == (2, 8)
+
+    cpus(16, torch_threads=4)
+    assert run.plan_workers() == (4, 4)
+
+    cpus(1, torch_threads=1)
+    assert run.plan_workers() == (1, 1)
+
+
+def test_default_threads_without_calibration(cpus):
+    """
+    Verifica el reparto por defecto cuando no hay calibración guardada.
+    """
+    cpus(8)
+
+    assert run.plan_workers() == (8 // run.DEFAULT_THREADS_PER_WORKER, run.DEFAULT_THREADS_PER_WORKER)
+
+
+def test_worker_threads_are_capped_at_the_share(cpus):
+    """
+    Verifica que los hilos de torch y de BLAS calibrados en un único proceso se
+    reducen a la parte de las CPUs de cada worker, y que los menores se respetan.
+    """
+    cpus(16, torch_threads=16, blas_threads=2)
+    workers, threads = run.plan_workers(4)
+
+    assert run.worker_settings(threads) == {
+        "transformer": {"torch_threads": 4},
+        "traditional": {"blas_threads": 2}
+    }
+
+    cpus(16)
+    run.AUTOTUNE_PATH.unlink()
+    assert run.worker_settings(4) == {
+        "transformer": {"torch_threads": 4},
+        "traditional": {"blas_threads": 4}
+    }
+
+
+@pytest.fixture
+def supervisor(monkeypatch):
+    """Supervisor sin workers reales: waitpid indica que todos los hijos han terminado."""
+    clock = {"now": 1000.0}
+    monkeypatch.setattr(run.time, "time", lambda: clock["now"])
+    monkeypatch.setattr(run.os, "waitpid", lambda pid, options: (pid, 256))
+    sup = run.Supervisor(app=None, sock=None, workers=1, threads=1)
+    sup.clock = clock
+    return sup
+
+
+def test_crash_loop_backs_off_exponentially(supervisor):
+    """
+    Verifica que los workers que mueren al arrancar se reinician con una espera
+    que se duplica hasta MAX_RESTART_DELAY.
+    """
+    delays = []
+    for pid in range(100, 107):
+        supervisor.children[pid] = supervisor.clock["now"] - 1
+        supervisor._reap()
+        delays.append(supervisor.restarts.pop() - supervisor.clock["now"])
+
+    assert delays == [2, 4, 8, 16, run.MAX_RESTART_DELAY, run.MAX_RESTART_DELAY, run.MAX_RESTART_DELAY]
+    assert supervisor.children == {}
+
+
+def test_worker_that_ran_long_enough_restarts_at_once(supervisor):
+    """
+    Verifica que un worker que llevaba más de MIN_UPTIME en marcha se reinicia
+    sin espera y reinicia la cuenta de fallos.
+    """
+    supervisor.failures = 3
+    supervisor.children[100] = supervisor.clock["now"] - run.MIN_UPTIME - 1
+    supervisor._reap()
+
+    assert supervisor.failures == 0
+    assert supervisor.restarts == [supervisor.clock["now"]]
+
+
+def test_no_restarts_while_stopping(supervisor):
+    """
+    Verifica que durante el apagado los workers terminados no se reemplazan.
+    """
+    supervisor.stopping = True
+    supervisor.children[100] = supervisor.clock["now"] - 1
+    supervisor._reap()
+
+    assert supervisor.children == {}
+    assert supervisor.restarts == []
@@ -0,0 +1,265 @@
+import asyncio  # Para ejecutar las corrutinas del planificador.
+import json  # Para leer la planificación guardada.
+import threading  # Para comprobar en qué hilo se usa cada cliente.
+from unittest.mock import Mock  # Para simular el monitor de YouTube.
+import pytest  # Para comparar números con tolerancia.
+from src.scheduler import MonitorScheduler  # Importa la clase que será probada.
+
+
+class FakeClock:
+    """Reloj controlable para las pruebas."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_comments(ids):
+    return [{"id": i, "text": f"comentario {i}"} for i in ids]
+
+
+def test_watch_coalesces_duplicates():
+    """
+    Verifica que dos peticiones sobre el mismo video se agrupan en una sola entrada.
+    """
+    scheduler = MonitorScheduler(Mock(spec=["get_comments"]), clock=FakeClock())
+
+    first = scheduler.watch("abc123def45", max_comments=20)
+    second = scheduler.watch("abc123def45", max_comments=50)
+
+    assert first is second
+    assert len(scheduler.videos) == 1
+    assert first.watchers == 2
+    assert first.max_comments == 50
+
+    # El video solo deja de monitorizarse cuando se retira el último observador.
+    assert scheduler.unwatch("abc123def45") is False
+    assert scheduler.unwatch("abc123def45") is True
+    assert scheduler.videos == {}
+
+
+def test_interval_adapts_to_comment_rate():
+    """
+    Verifica que un video activo se consulta más a menudo que uno inactivo.
+    """
+    clock = FakeClock()
+    scheduler = MonitorScheduler(Mock(spec=["get_comments"]), clock=clock, daily_quota=1_000_000,
+                                 min_interval=10, max_interval=3600,
+                                 target_comments_per_poll=20)
+    busy = scheduler.watch("busyvideo01")
+    idle = scheduler.watch("idlevideo01")
+
+    scheduler.record_poll(busy, make_comments(["a", "b"]))
+    scheduler.record_poll(idle, make_comments(["x"]))
+
+    for round_ in range(5):
+        clock.now += 100
+        # 50 comentarios nuevos por página de 60: el video va rápido pero no está saturado.
+        page = [f"c{round_}_{i}" for i in range(50)] + ["a"] * 10
+        scheduler.record_poll(busy, make_comments(page))
+        scheduler.record_poll(idle, make_comments(["x"]))
+
+    assert busy.rate > 0
+    assert idle.rate == 0
+    assert busy.interval < idle.interval
+    assert scheduler.min_interval <= busy.interval <= scheduler.max_interval
+
+
+def test_quota_is_shared_by_aggregate_demand():
+    """
+    Verifica que un video activo aprovecha la cuota que no usan los inactivos y
+    que los intervalos solo se alargan cuando la demanda conjunta supera la cuota.
+    """
+    clock = FakeClock()
+    # 8640 unidades/día -> 0,1 consultas por segundo entre todos los videos.
+    scheduler = MonitorScheduler(Mock(spec=["get_comments"]), clock=clock, daily_quota=8640,
+                                 min_interval=10, max_interval=3600)
+    for i in range(10):
+        scheduler.watch(f"video{i:06d}").interval = 3600
+    busy = scheduler.videos["video000000"]
+    busy.interval = 10
+    # Página llena de comentarios nuevos: el video pide el intervalo mínimo.
+    busy.last_poll = clock.now - 10
+
+    # Nueve videos casi parados (0,0025/s) y uno a 0,1/s: apenas se pasa de la cuota.
+    assert scheduler.quota_scale() == pytest.approx(1.025)
+    scheduler.record_poll(busy, make_comments(["a"]))
+    assert busy.interval == 10
+    assert busy.next_poll - clock.now == pytest.approx(10.25)
+
+    # Con todos los videos activos la demanda es 10 veces la cuota: todos se alargan igual.
+    for schedule in scheduler.videos.values():
+        schedule.interval = 10
+    assert scheduler.quota_scale() == pytest.approx(10)
+    scheduler.record_poll(busy, make_comments(["a", "b"]))
+    assert busy.next_poll - clock.now == pytest.approx(100)
+
+
+def test_schedule_persists_and_resumes(tmp_path):
+    """
+    Verifica que la planificación se guarda en disco y se reanuda tras un reinicio.
+    """
+    path = str(tmp_path / "schedule.json")
+    clock = FakeClock()
+    scheduler = MonitorScheduler(Mock(spec=["get_comments"]), schedule_path=path, clock=clock)
+    schedule = scheduler.watch("abc123def45")
+    scheduler.record_poll(schedule, make_comments(["a", "b"]))
+    scheduler.save()
+
+    clock.now += 10_000
+    restored = MonitorScheduler(Mock(spec=["get_comments"]), schedule_path=path, clock=clock)
+
+    assert list(restored.videos) == ["abc123def45"]
+    restored_schedule = restored.videos["abc123def45"]
+    assert restored_schedule.seen_ids == ["a", "b"]
+    # La consulta vencida se reprograma a partir de ahora, no en el pasado.
+    assert restored_schedule.next_poll >= clock.now
+
+
+def test_save_during_poll_resumes_after_crash(tmp_path):
+    """
+    Verifica que un guardado con una consulta en curso no deja el video sin
+    próxima consulta al reanudar, también con ficheros antiguos que guardaban Infinity.
+    """
+    path = str(tmp_path / "schedule.json")
+    clock = FakeClock()
+    monitor = Mock(spec=["get_comments"])
+    monitor.get_comments.return_value = make_comments(["a"])
+    scheduler = MonitorScheduler(monitor, schedule_path=path, clock=clock)
+    scheduler.watch("abc123def45")
+
+    async def on_comments(video_id, comments):
+        # Guardado periódico mientras el video está en curso, seguido de una caída.
+        assert scheduler.videos[video_id].in_flight
+        scheduler.save()
+        scheduler.stop()
+
+    asyncio.run(scheduler.run(on_comments))
+    saved = json.loads(open(path, encoding="utf-8").read())
+    saved_next_poll = saved["videos"][0]["next_poll"]
+    assert saved_next_poll < float("inf")
+
+    clock.now = saved_next_poll + 1
+    restored = MonitorScheduler(Mock(spec=["get_comments"]), schedule_path=path, clock=clock)
+    assert [s.video_id for s in restored.due_videos()] == ["abc123def45"]
+
+    saved["videos"][0]["next_poll"] = float("inf")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(saved, f)
+    restored = MonitorScheduler(Mock(spec=["get_comments"]), schedule_path=path, clock=clock)
+    assert [s.video_id for s in restored.due_videos()] == ["abc123def45"]
+
+
+def test_run_polls_due_videos_and_reports_new_comments():
+    """
+    Verifica que el bucle consulta los videos pendientes y notifica solo los comentarios nuevos.
+    """
+    monitor = Mock(spec=["get_comments"])
+    monitor.get_comments.return_value = make_comments(["a", "b"])
+    scheduler = MonitorScheduler(monitor, clock=FakeClock())
+    scheduler.watch("abc123def45", max_comments=2)
+    received = []
+
+    async def on_comments(video_id, comments):
+        received.append((video_id, [c["id"] for c in comments]))
+        scheduler.stop()
+
+    asyncio.run(scheduler.run(on_comments))
+
+    monitor.get_comments.assert_called_once_with("abc123def45", 2)
+    assert received == [("abc123def45", ["a", "b"])]
+    assert scheduler.quota_spent == 1
+
+
+def test_slow_or_failing_callback_does_not_block_other_videos():
+    """
+    Verifica que un on_comments lento o que falla no detiene las consultas de los demás videos.
+    """
+    monitor = Mock(spec=["get_comments"])
+    calls = {"n": 0}
+
+    def get_comments(video_id, max_results):
+        calls["n"] += 1
+        return make_comments([f"{video_id}-{calls['n']}"])
+
+    monitor.get_comments.side_effect = get_comments
+    scheduler = MonitorScheduler(monitor_factory=lambda: monitor, daily_quota=10**9,
+                                 min_interval=0.05, max_interval=0.05, max_concurrent=4)
+    for video_id in ("slowvideo01", "failvideo01", "fastvideo01"):
+        scheduler.watch(video_id)
+    polled = {"slowvideo01": 0, "failvideo01": 0, "fastvideo01": 0}
+
+    async def on_comments(video_id, comments):
+        polled[video_id] += 1
+        if video_id == "slowvideo01":
+            await asyncio.sleep(1)
+        elif video_id == "failvideo01":
+            raise RuntimeError("fallo")
+
+    async def main():
+        asyncio.get_running_loop().call_later(0.5, scheduler.stop)
+        await scheduler.run(on_comments)
+
+    asyncio.run(main())
+
+    assert polled["slowvideo01"] == 1
+    assert polled["failvideo01"] >= 4
+    assert polled["fastvideo01"] >= 4
+
+
+def test_each_poll_thread_gets_its_own_client():
+    """
+    Verifica que con monitor_factory cada hilo de consulta usa su propio cliente.
+    """
+    class FakeMonitor:
+        def __init__(self):
+            self.threads = set()
+
+        def get_comments(self, video_id, max_results):
+            self.threads.add(threading.get_ident())
+            return []
+
+    created = []
+
+    def factory():
+        created.append(FakeMonitor())
+        return created[-1]
+
+    scheduler = MonitorScheduler(monitor_factory=factory, daily_quota=10**9,
+                                 min_interval=0.02, max_interval=0.02, max_concurrent=3)
+    for i in range(6):
+        scheduler.watch(f"video{i:06d}")
+
+    async def on_comments(video_id, comments):
+        pass
+
+    async def main():
+        asyncio.get_running_loop().call_later(0.3, scheduler.stop)
+        await scheduler.run(on_comments)
+
+    asyncio.run(main())
+
+    assert 1 <= len(created) <= 3
+    assert all(len(monitor.threads) == 1 for monitor in created)
+
+
+def test_polls_are_saved_on_a_timer(tmp_path):
+    """
+    Verifica que las consultas no reescriben la planificación cada vez, sino cada save_interval.
+    """
+    path = tmp_path / "schedule.json"
+    clock = FakeClock()
+    scheduler = MonitorScheduler(Mock(spec=["get_comments"]), schedule_path=str(path),
+                                 clock=clock, save_interval=30)
+    schedule = scheduler.watch("abc123def45")
+    scheduler.record_poll(schedule, make_comments(["a"]))
+
+    clock.now += 10
+    scheduler._save_if_due()
+    assert json.loads(path.read_text())["videos"][0]["seen_ids"] == []
+
+    clock.now += 30
+    scheduler._save_if_due()
+    assert json.loads(path.read_text())["videos"][0]["seen_ids"] == ["a"]
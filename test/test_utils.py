@@ -0,0 +1,55 @@
+import pytest  # Para omitir las pruebas si faltan dependencias del frontend.
+
+pytest.importorskip("pandas")
+pytest.importorskip("streamlit")
+
+from frontend.utils import build_results_frame, filter_results, paginate_results  # Importa las funciones que serán probadas.
+
+
+def make_results():
+    return [
+        {"id": "c1", "author": "Ana", "date": "2024-01-01T10:00:00Z", "text": "Buen video",
+         "likes": 5, "prediction": 0, "probability": 0.10, "model_used": "transformer"},
+        {"id": "c2", "author": "Luis", "date": "2024-01-02T10:00:00Z", "text": "Eres un idiota",
+         "likes": 1, "prediction": 1, "probability": 0.92, "model_used": "transformer"},
+        {"id": "c3", "author": "Marta", "date": "2024-01-03T10:00:00Z", "text": "No estoy de acuerdo",
+         "likes": 8, "prediction": 0, "probability": 0.45, "model_used": "transformer"},
+        {"id": "c4", "author": "Pedro", "date": "2024-01-04T10:00:00Z", "text": "Qué IDIOTA",
+         "likes": 0, "prediction": 1, "probability": 0.75, "model_used": "transformer"},
+    ]
+
+
+def test_filter_by_label_and_probability():
+    """
+    Verifica que se filtra por etiqueta y probabilidad mínima.
+    """
+    df = build_results_frame(make_results())
+
+    assert list(filter_results(df, label="Odio")["id"]) == ["c4", "c2"]
+    assert list(filter_results(df, label="Sin odio")["id"]) == ["c3", "c1"]
+    assert list(filter_results(df, min_probability=0.45)["id"]) == ["c4", "c3", "c2"]
+
+
+def test_filter_search_and_sort():
+    """
+    Verifica que la búsqueda no distingue mayúsculas, incluye al autor y respeta el orden pedido.
+    """
+    df = build_results_frame(make_results())
+
+    assert list(filter_results(df, search="idiota", sort_by="probability", ascending=True)["id"]) == ["c4", "c2"]
+    assert list(filter_results(df, search="marta")["id"]) == ["c3"]
+    # Los caracteres especiales se buscan literalmente, no como expresión regular.
+    assert filter_results(df, search="(").empty
+
+
+def test_paginate_results():
+    """
+    Verifica que solo se devuelven las filas de la página pedida.
+    """
+    df = build_results_frame(make_results())
+
+    assert list(paginate_results(df, 1, 3)["id"]) == ["c1", "c2", "c3"]
+    assert list(paginate_results(df, 2, 3)["id"]) == ["c4"]
+    assert paginate_results(df, 3, 3).empty
+    # Una página menor que 1 se trata como la primera.
+    assert list(paginate_results(df, 0, 2)["id"]) == ["c1", "c2"]
@@ -0,0 +1,55 @@
+import pytest  # Importa pytest para las pruebas que necesitan msgpack.
+from src import wire  # Importa el módulo que será probado.
+
+
+def test_negotiate_defaults_to_full_json():
+    """
+    Verifica que sin cabecera Accept (o con application/json) se devuelve la respuesta completa.
+    """
+    assert wire.negotiate(None) == wire.FULL
+    assert wire.negotiate("application/json") == wire.FULL
+    assert wire.negotiate("*/*") == wire.FULL
+
+
+def test_negotiate_lean_by_header_or_query():
+    """
+    Verifica que el formato ligero se puede pedir por cabecera o con el parámetro view=lean.
+    """
+    assert wire.negotiate("application/vnd.hateshield.lean+json") == wire.LEAN
+    assert wire.negotiate(None, view="lean") == wire.LEAN
+
+
+def test_negotiate_respects_quality_values():
+    """
+    Verifica que se respetan las preferencias q de la cabecera Accept.
+    """
+    accept = "application/json;q=0.5, application/vnd.hateshield.lean+json"
+    assert wire.negotiate(accept) == wire.LEAN
+
+
+def test_lean_batch_round_trip():
+    """
+    Verifica que el lote ligero en JSON es columnar y se decodifica correctamente.
+    """
+    content, media_type = wire.encode_batch(wire.LEAN, [0, 1], [0.1, 0.9], "traditional", 0.59)
+    batch = wire.decode_batch(content, media_type)
+
+    assert batch == {"model_used": "traditional", "threshold": 0.59,
+                     "prediction": [0, 1], "probability": [0.1, 0.9]}
+
+
+def test_msgpack_batch_is_compact_and_round_trips():
+    """
+    Verifica que el lote MessagePack ocupa unos 5 bytes por comentario y se decodifica correctamente.
+    """
+    pytest.importorskip("msgpack")
+    predictions = [i % 2 for i in range(1000)]
+    probabilities = [i / 1000 for i in range(1000)]
+
+    content, media_type = wire.encode_batch(wire.MSGPACK, predictions, probabilities, "transformer", 0.59)
+    batch = wire.decode_batch(content, media_type)
+
+    assert media_type == "application/x-msgpack"
+    assert len(content) < 1000 * 5 + 100
+    assert batch["prediction"] == predictions
+    assert batch["probability"] == pytest.approx(probabilities, abs=1e-6)
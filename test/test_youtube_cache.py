@@ -0,0 +1,158 @@
+import json  # Para construir las respuestas del servidor simulado.
+import os  # Para envejecer las entradas de la caché.
+import time  # Para calcular fechas de modificación antiguas.
+import threading  # Para ejecutar el servidor HTTP local en segundo plano.
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Servidor HTTP local que sustituye a YouTube.
+import pytest  # Importa pytest para las fixtures.
+
+httplib2 = pytest.importorskip("httplib2")  # El transporte real del cliente de Google.
+from src.youtube_cache import CachingHttp  # Importa la clase que será probada.
+
+
+class FakeYouTubeHandler(BaseHTTPRequestHandler):
+    """Simula el endpoint commentThreads con soporte de ETag."""
+
+    etag = '"v1"'
+    requests = []
+
+    def do_GET(self):
+        FakeYouTubeHandler.requests.append({"path": self.path, "if_none_match": self.headers.get("If-None-Match")})
+        if self.headers.get("If-None-Match") == FakeYouTubeHandler.etag:
+            self.send_response(304)
+            self.send_header("ETag", FakeYouTubeHandler.etag)
+            self.end_headers()
+            return
+
+        body = json.dumps({"items": [], "etag": FakeYouTubeHandler.etag}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", FakeYouTubeHandler.etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def youtube_server():
+    FakeYouTubeHandler.etag = '"v1"'
+    FakeYouTubeHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeYouTubeHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/youtube/v3/commentThreads"
+    server.shutdown()
+
+
+def test_unchanged_page_is_revalidated_with_etag(tmp_path, youtube_server):
+    """
+    Verifica que la segunda consulta envía If-None-Match y reutiliza la copia guardada al recibir 304.
+    """
+    http = CachingHttp(str(tmp_path))
+    uri = f"{youtube_server}?part=snippet&videoId=abc123def45&key=SECRETO"
+
+    first_resp, first_content = http.request(uri)
+    second_resp, second_content = http.request(uri)
+
+    assert first_resp.status == 200
+    assert second_resp.status == 200
+    assert second_content == first_content
+    assert FakeYouTubeHandler.requests[1]["if_none_match"] == '"v1"'
+    assert http.stats == {"fresh_hits": 0, "not_modified": 1, "misses": 1}
+    assert http.quota_for("abc123def45") == 2
+
+
+def test_fresh_entries_skip_the_network(tmp_path, youtube_server):
+    """
+    Verifica que, dentro del TTL, la respuesta sale del disco sin hacer petición ni gastar cuota.
+    """
+    http = CachingHttp(str(tmp_path), ttl=60)
+    uri = f"{youtube_server}?part=snippet&videoId=abc123def45&key=SECRETO"
+
+    http.request(uri)
+    http.request(uri)
+
+    assert len(FakeYouTubeHandler.requests) == 1
+    assert http.last_request_cost == 0
+    assert http.quota_for("abc123def45") == 1
+
+
+def test_cache_survives_restart_and_ignores_api_key(tmp_path, youtube_server):
+    """
+    Verifica que la caché está en disco y que la API key no forma parte de la clave.
+    """
+    CachingHttp(str(tmp_path)).request(f"{youtube_server}?videoId=abc123def45&key=UNO")
+
+    restarted = CachingHttp(str(tmp_path), revalidation_cost=0)
+    FakeYouTubeHandler.etag = '"v2"'  # La página ha cambiado: debe volver a descargarse.
+    resp, _ = restarted.request(f"{youtube_server}?key=DOS&videoId=abc123def45")
+
+    assert FakeYouTubeHandler.requests[1]["if_none_match"] == '"v1"'
+    assert resp.status == 200
+    assert restarted.stats["misses"] == 1
+    assert all("UNO" not in path.read_text() for path in tmp_path.glob("*.json"))
+
+
+def test_last_request_cost_is_per_thread(tmp_path, youtube_server):
+    """
+    Verifica que el coste de la última petición de un hilo no lo pisa otro hilo que usa la misma caché.
+    """
+    http = CachingHttp(str(tmp_path), ttl=60)
+    uri = f"{youtube_server}?part=snippet&videoId=abc123def45&key=SECRETO"
+    http.request(uri)
+    http.request(uri)
+    assert http.last_request_cost == 0
+
+    other = threading.Thread(target=http.request, args=(f"{youtube_server}?videoId=otrovideo01",))
+    other.start()
+    other.join()
+
+    # El otro hilo pagó una unidad, pero la última petición de este hilo salió de la caché.
+    assert http.last_request_cost == 0
+    assert http.quota_for("otrovideo01") == 1
+
+
+def test_stale_entries_are_pruned(tmp_path, youtube_server):
+    """
+    Verifica que las entradas sin usar durante más de max_age se borran y se conserva la cuota.
+    """
+    http = CachingHttp(str(tmp_path), max_age=3600)
+    http.request(f"{youtube_server}?videoId=viejovideo1")
+    http.request(f"{youtube_server}?videoId=nuevovideo1")
+    old_entry = tmp_path / f"{http.cache_key('GET', f'{youtube_server}?videoId=viejovideo1')}.json"
+    two_hours_ago = time.time() - 7200
+    os.utime(old_entry, (two_hours_ago, two_hours_ago))
+
+    assert http.prune() == 1
+    assert not old_entry.exists()
+    assert len(list(tmp_path.glob("*.json"))) == 2  # la entrada reciente y quota.json
+
+
+def test_instances_sharing_a_directory_keep_every_count(tmp_path, youtube_server):
+    """
+    Verifica que varias instancias sobre el mismo directorio (un cliente por hilo de
+    consulta) no se borran el consumo de cuota la una a la otra.
+    """
+    first, second, third = (CachingHttp(str(tmp_path)) for _ in range(3))
+
+    def poll(http, video_id):
+        for _ in range(10):
+            http.request(f"{youtube_server}?videoId={video_id}")
+
+    # Una instancia por hilo, como hace el planificador; dos de ellas consultan el mismo video.
+    threads = [
+        threading.Thread(target=poll, args=(first, "primero0001")),
+        threading.Thread(target=poll, args=(second, "segundo0001")),
+        threading.Thread(target=poll, args=(third, "primero0001"))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert first.quota_for("primero0001") == 20
+    assert first.quota_for("segundo0001") == 10
+    assert CachingHttp(str(tmp_path)).quota_for("segundo0001") == 10
+    assert sum(second.stats.values()) == 10